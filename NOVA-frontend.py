@@ -1,4 +1,4 @@
-from flask import Flask, request, render_template, redirect, url_for, flash, jsonify
+from flask import Flask, request, render_template, redirect, url_for, flash, jsonify, Response, stream_with_context
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_sqlalchemy import SQLAlchemy
 from flask_wtf import FlaskForm, CSRFProtect
@@ -10,12 +10,23 @@ from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_talisman import Talisman
 import json
+import copy
+import threading
+import tempfile
+import sqlite3
+import socket
+import struct
+import zlib
+import atexit
+from contextlib import contextmanager
 import logging
 from logging.handlers import RotatingFileHandler
 import os
 import datetime
 import sys
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 import pyttsx3
 
 # Ensure the instance directory exists
@@ -37,6 +48,15 @@ app.config['MAIL_DEFAULT_SENDER'] = 'noreply@vibrationrobotics.com'
 app.config['SECURITY_PASSWORD_SALT'] = 'my_precious_two'
 
 db = SQLAlchemy(app)
+
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets dashboard reads run while NOVA writes command history
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
 mail = Mail(app)
 limiter = Limiter(get_remote_address, app=app)
 
@@ -52,13 +72,222 @@ console_handler.setLevel(logging.DEBUG)
 console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
 logging.basicConfig(level=logging.DEBUG, handlers=[handler, console_handler], format='%(asctime)s - %(levelname)s - %(message)s')
 
+class ConfigStore:
+    # Mutations are applied under a lock and written back atomically after a short quiet period
+    def __init__(self, path, debounce=0.5):
+        self.path = path
+        self.debounce = debounce
+        self.lock = threading.RLock()
+        self.data = {}
+        self.version = 0
+        self.saved_version = 0
+        self.listeners = []
+        self.timer = None
+        try:
+            with open(path) as config_file:
+                self.data = json.load(config_file)
+            logging.debug("Loaded configuration")
+        except Exception as e:
+            logging.error(f"Error loading configuration: {e}")
+
+    def snapshot(self):
+        with self.lock:
+            return copy.deepcopy(self.data)
+
+    def get(self, key, default=None):
+        with self.lock:
+            return copy.deepcopy(self.data.get(key, default))
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    @contextmanager
+    def mutate(self):
+        with self.lock:
+            before = copy.deepcopy(self.data)
+            yield self.data
+            changed = sorted(key for key in set(before) | set(self.data) if before.get(key) != self.data.get(key))
+            if not changed:
+                return
+            self.version += 1
+            version = self.version
+            self._schedule_save()
+        for listener in self.listeners:
+            try:
+                listener(version, changed)
+            except Exception as e:
+                logging.error(f"Error in configuration listener: {e}")
+
+    def _schedule_save(self):
+        if self.timer is not None:
+            self.timer.cancel()
+        self.timer = threading.Timer(self.debounce, self.flush)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def flush(self):
+        with self.lock:
+            if self.saved_version == self.version:
+                return
+            version = self.version
+            contents = json.dumps(self.data, indent=4)
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            with tempfile.NamedTemporaryFile('w', dir=directory, prefix='.config-', suffix='.json', delete=False) as temp_file:
+                temp_file.write(contents)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            os.replace(temp_file.name, self.path)
+            with self.lock:
+                self.saved_version = max(self.saved_version, version)
+            logging.debug(f"Configuration saved (version {version})")
+        except Exception as e:
+            logging.error(f"Error saving configuration: {e}")
+
 # Load configuration
-try:
-    with open('config.json') as config_file:
-        config = json.load(config_file)
-    logging.debug("Loaded configuration")
-except Exception as e:
-    logging.error(f"Error loading configuration: {e}")
+config_store = ConfigStore('config.json')
+config_store.subscribe(lambda version, sections: logging.info(f"Configuration version {version} changed: {', '.join(sections)}"))
+atexit.register(config_store.flush)
+
+class LogIndex:
+    # Indexes log lines by byte offset so the dashboard never rereads the whole file.
+    # Rows remember which file they came from (inode plus a checksum of its first line), which lets
+    # them follow RotatingFileHandler renames without being confused by reused inodes.
+    LEVELS = ['INFO', 'WARNING', 'ERROR', 'DEBUG']
+
+    def __init__(self, log_path, index_path, backup_count=5):
+        self.log_path = log_path
+        self.backup_count = backup_count
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(index_path, check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS log_state (id INTEGER PRIMARY KEY CHECK (id = 1), file_key TEXT, offset INTEGER);
+            CREATE TABLE IF NOT EXISTS log_lines (id INTEGER PRIMARY KEY AUTOINCREMENT, file_key TEXT NOT NULL,
+                offset INTEGER NOT NULL, timestamp TEXT NOT NULL, level TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS ix_log_lines_level ON log_lines (level, id);
+            CREATE INDEX IF NOT EXISTS ix_log_lines_timestamp ON log_lines (timestamp);
+            CREATE INDEX IF NOT EXISTS ix_log_lines_file ON log_lines (file_key);
+            CREATE TABLE IF NOT EXISTS log_counts (level TEXT PRIMARY KEY, count INTEGER NOT NULL);
+        """)
+        self.db.commit()
+
+    @staticmethod
+    def _file_key(path):
+        with open(path, 'rb') as log_file:
+            first_line = log_file.readline(256)
+        return f"{os.stat(path).st_ino}:{zlib.crc32(first_line)}"
+
+    def _log_files(self):
+        # Maps file keys to paths for the live log and its rotated backups
+        files = {}
+        for path in [self.log_path] + [f"{self.log_path}.{i}" for i in range(1, self.backup_count + 1)]:
+            try:
+                files[self._file_key(path)] = path
+            except OSError:
+                continue
+        return files
+
+    @staticmethod
+    def parse_line(line):
+        if line.startswith('{'):
+            try:
+                record = json.loads(line)
+                return record.get('timestamp', ''), record.get('level', ''), record.get('message', '')
+            except ValueError:
+                return None
+        parts = line.rstrip('\n').split(' - ')
+        if len(parts) > 2:
+            return parts[0], parts[1], ' - '.join(parts[2:])
+        return None
+
+    def _index_file(self, path, file_key, offset):
+        rows = []
+        counts = {}
+        with open(path, 'rb') as log_file:
+            log_file.seek(offset)
+            while True:
+                line = log_file.readline()
+                if not line or not line.endswith(b'\n'):
+                    break
+                parsed = self.parse_line(line.decode('utf-8', errors='replace'))
+                if parsed and parsed[1] in self.LEVELS:
+                    rows.append((file_key, offset, parsed[0], parsed[1]))
+                    counts[parsed[1]] = counts.get(parsed[1], 0) + 1
+                offset += len(line)
+        self.db.executemany("INSERT INTO log_lines (file_key, offset, timestamp, level) VALUES (?, ?, ?, ?)", rows)
+        for level, count in counts.items():
+            self.db.execute("INSERT INTO log_counts (level, count) VALUES (?, ?) "
+                            "ON CONFLICT(level) DO UPDATE SET count = count + excluded.count", (level, count))
+        return offset
+
+    def refresh(self):
+        with self.lock:
+            files = self._log_files()
+            state = self.db.execute("SELECT file_key, offset FROM log_state WHERE id = 1").fetchone()
+            try:
+                current_key = self._file_key(self.log_path)
+            except OSError:
+                return
+            if state and state[0] != current_key and state[0] in files:
+                # The file was rotated: finish the part of it we had not read yet
+                self._index_file(files[state[0]], state[0], state[1])
+            offset = state[1] if state and state[0] == current_key else 0
+            if offset > os.path.getsize(self.log_path):
+                offset = 0
+            offset = self._index_file(self.log_path, current_key, offset)
+            self.db.execute("INSERT OR REPLACE INTO log_state (id, file_key, offset) VALUES (1, ?, ?)", (current_key, offset))
+
+            # Forget lines whose file has been rotated out of existence
+            placeholders = ','.join('?' * len(files))
+            gone = self.db.execute(f"SELECT level, COUNT(*) FROM log_lines WHERE file_key NOT IN ({placeholders}) GROUP BY level",
+                                   list(files)).fetchall()
+            if gone:
+                for level, count in gone:
+                    self.db.execute("UPDATE log_counts SET count = count - ? WHERE level = ?", (count, level))
+                self.db.execute(f"DELETE FROM log_lines WHERE file_key NOT IN ({placeholders})", list(files))
+            self.db.commit()
+
+    def counts(self):
+        with self.lock:
+            counts = dict(self.db.execute("SELECT level, count FROM log_counts").fetchall())
+        return {level.lower(): counts.get(level, 0) for level in self.LEVELS}
+
+    def query(self, level=None, since=None, until=None, before=None, limit=100):
+        clauses, params = [], []
+        if level:
+            clauses.append("level = ?")
+            params.append(level)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp <= ?")
+            params.append(until)
+        if before:
+            clauses.append("id < ?")
+            params.append(before)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.lock:
+            rows = self.db.execute(f"SELECT id, file_key, offset, timestamp, level FROM log_lines {where} "
+                                   f"ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()
+        files = self._log_files()
+        entries = []
+        handles = {}
+        try:
+            for row_id, file_key, offset, timestamp, row_level in rows:
+                path = files.get(file_key)
+                if path is None:
+                    continue
+                if path not in handles:
+                    handles[path] = open(path, 'rb')
+                handles[path].seek(offset)
+                parsed = self.parse_line(handles[path].readline().decode('utf-8', errors='replace'))
+                message = parsed[2].rstrip('\n') if parsed else ''
+                entries.append({'id': row_id, 'timestamp': timestamp, 'level': row_level, 'message': message})
+        finally:
+            for handle in handles.values():
+                handle.close()
+        return entries
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -88,6 +317,71 @@ class User(UserMixin, db.Model):
             return None
         return User.query.get(user_id)
 
+class CommandHistory(db.Model):
+    # Written by NOVA in batches (see CommandHistoryWriter in NOVA.py); keep the two schemas in sync
+    __tablename__ = 'command_history'
+    __table_args__ = (
+        db.Index('ix_command_history_user_created', 'user_id', 'created_at'),
+        db.Index('ix_command_history_user_handler', 'user_id', 'handler'),
+        db.Index('ix_command_history_created', 'created_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(80), nullable=False)
+    command_id = db.Column(db.String(40))
+    source = db.Column(db.String(16))
+    command = db.Column(db.Text, nullable=False)
+    action = db.Column(db.Text)
+    handler = db.Column(db.String(80))
+    success = db.Column(db.Boolean, nullable=False)
+    error = db.Column(db.Text)
+    parse_ms = db.Column(db.Float)
+    execute_ms = db.Column(db.Float)
+    total_ms = db.Column(db.Float)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    @classmethod
+    def _filtered(cls, query, user_id=None, since=None):
+        if user_id:
+            query = query.filter(cls.user_id == user_id)
+        if since:
+            query = query.filter(cls.created_at >= since)
+        return query
+
+    @classmethod
+    def users(cls):
+        return [row[0] for row in db.session.query(cls.user_id).distinct().order_by(cls.user_id)]
+
+    @classmethod
+    def top_commands(cls, user_id=None, since=None, limit=10):
+        count = db.func.count(cls.id)
+        query = cls._filtered(db.session.query(cls.action, count.label('count')), user_id, since)
+        rows = query.filter(cls.action.isnot(None)).group_by(cls.action).order_by(count.desc()).limit(limit)
+        return [{'action': action, 'count': total} for action, total in rows]
+
+    @classmethod
+    def failure_rates(cls, user_id=None, since=None):
+        failures = db.func.sum(db.case((cls.success == db.false(), 1), else_=0))
+        query = cls._filtered(db.session.query(cls.handler, db.func.count(cls.id), failures), user_id, since)
+        rows = query.group_by(cls.handler).order_by(db.func.count(cls.id).desc())
+        return [{'handler': handler or 'unrecognized', 'total': total, 'failures': failed or 0,
+                 'failure_rate': (failed or 0) / total if total else 0.0} for handler, total, failed in rows]
+
+    @classmethod
+    def latency_trend(cls, user_id=None, days=14):
+        since = datetime.datetime.now() - datetime.timedelta(days=days)
+        day = db.func.date(cls.created_at)
+        query = cls._filtered(db.session.query(day, db.func.count(cls.id), db.func.avg(cls.total_ms),
+                                               db.func.max(cls.total_ms), db.func.avg(cls.parse_ms)), user_id, since)
+        return [{'day': date, 'count': total, 'avg_ms': avg_ms or 0.0, 'max_ms': max_ms or 0.0, 'parse_avg_ms': parse_ms or 0.0}
+                for date, total, avg_ms, max_ms, parse_ms in query.group_by(day).order_by(day)]
+
+    @classmethod
+    def prune(cls, days):
+        cutoff = datetime.datetime.now() - datetime.timedelta(days=days)
+        deleted = cls.query.filter(cls.created_at < cutoff).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
 @login_manager.user_loader
 def load_user(user_id):
     return db.session.get(User, int(user_id))  # Updated to use Session.get()
@@ -221,7 +515,7 @@ def logout():
 @app.route('/')
 @login_required
 def index():
-    return render_template('index.html', config=config)
+    return render_template('index.html', config=config_store.snapshot())
 
 @app.route('/confirm/<token>')
 def confirm_email(token):
@@ -275,8 +569,8 @@ def reset_token(token):
 def update():
     key = request.form['key']
     value = request.form['value']
-    config[key] = value
-    save_config()
+    with config_store.mutate() as config:
+        config[key] = value
     return redirect(url_for('index'))
 
 @app.route('/update_program', methods=['POST'])
@@ -284,16 +578,15 @@ def update():
 def update_program():
     program = request.form['program']
     path = request.form['path']
-    config["program_mapping"][program] = path
-    save_config()
+    with config_store.mutate() as config:
+        config.setdefault("program_mapping", {})[program] = path
     return redirect(url_for('index'))
 
 @app.route('/delete_program/<program>', methods=['POST'])
 @login_required
 def delete_program(program):
-    if program in config["program_mapping"]:
-        del config["program_mapping"][program]
-        save_config()
+    with config_store.mutate() as config:
+        config.get("program_mapping", {}).pop(program, None)
     return redirect(url_for('index'))
 
 @app.route('/edit_program/<program>', methods=['GET', 'POST'])
@@ -301,10 +594,10 @@ def delete_program(program):
 def edit_program(program):
     if request.method == 'POST':
         path = request.form['path']
-        config["program_mapping"][program] = path
-        save_config()
+        with config_store.mutate() as config:
+            config.setdefault("program_mapping", {})[program] = path
         return redirect(url_for('index'))
-    return render_template('edit_program.html', program=program, path=config["program_mapping"].get(program, ''))
+    return render_template('edit_program.html', program=program, path=config_store.get("program_mapping", {}).get(program, ''))
 
 @app.route('/custom_commands', methods=['GET', 'POST'])
 @login_required
@@ -312,33 +605,25 @@ def custom_commands():
     if request.method == 'POST':
         command = request.form['command']
         action = request.form['action']
-        config['custom_commands'][command] = action
-        save_config()
+        with config_store.mutate() as config:
+            config.setdefault('custom_commands', {})[command] = action
         flash('Custom command added successfully.', 'success')
         return redirect(url_for('custom_commands'))
-    return render_template('custom_commands.html', custom_commands=config.get('custom_commands', {}))
-
-def save_config():
-    try:
-        with open('config.json', 'w') as config_file:
-            json.dump(config, config_file, indent=4)
-        logging.debug("Configuration saved")
-    except Exception as e:
-        logging.error(f"Error saving configuration: {e}")
+    return render_template('custom_commands.html', custom_commands=config_store.get('custom_commands', {}))
 
 @app.route('/api/config', methods=['GET'])
 @login_required
 def get_config():
-    return jsonify(config)
+    return jsonify(config_store.snapshot())
 
 @app.route('/api/config', methods=['POST'])
 @login_required
 def set_config():
     data = request.json
-    for key, value in data.items():
-        config[key] = value
-    save_config()
-    return jsonify(config), 200
+    with config_store.mutate() as config:
+        for key, value in data.items():
+            config[key] = value
+    return jsonify(config_store.snapshot()), 200
 
 @app.route('/api/config/program', methods=['POST'])
 @login_required
@@ -347,43 +632,244 @@ def add_program_mapping():
     program = data.get('program')
     path = data.get('path')
     if program and path:
-        config["program_mapping"][program] = path
-        save_config()
-        return jsonify(config["program_mapping"]), 200
+        with config_store.mutate() as config:
+            config.setdefault("program_mapping", {})[program] = path
+        return jsonify(config_store.get("program_mapping", {})), 200
     return jsonify({'error': 'Invalid data'}), 400
 
 @app.route('/api/config/program/<program>', methods=['DELETE'])
 @login_required
 def remove_program_mapping(program):
-    if program in config["program_mapping"]:
-        del config["program_mapping"][program]
-        save_config()
-        return jsonify(config["program_mapping"]), 200
+    with config_store.mutate() as config:
+        removed = config.get("program_mapping", {}).pop(program, None)
+    if removed is not None:
+        return jsonify(config_store.get("program_mapping", {})), 200
     return jsonify({'error': 'Program not found'}), 404
 
+log_index = LogIndex(config_store.get('dashboard_log', config_store.get('logging', {}).get('path', 'logs/Nova.log')), os.path.join('instance', 'log_index.db'))
+
+def load_metrics():
+    # NOVA writes its latency histograms to this file; see the "metrics" config section
+    path = config_store.get("metrics", {}).get("path", os.path.join('instance', 'metrics.json'))
+    try:
+        with open(path) as metrics_file:
+            return json.load(metrics_file)
+    except (OSError, ValueError):
+        return {"updated": None, "bucket_bounds": [], "stages": {}, "counters": []}
+
+def render_prometheus(snapshot):
+    lines = [
+        "# HELP nova_stage_latency_seconds Time spent in each stage of a command.",
+        "# TYPE nova_stage_latency_seconds histogram",
+    ]
+    bounds = snapshot.get("bucket_bounds", [])
+    for stage, histogram in sorted(snapshot.get("stages", {}).items()):
+        cumulative = 0
+        for bound, count in zip(bounds + ["+Inf"], histogram["buckets"]):
+            cumulative += count
+            lines.append(f'nova_stage_latency_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'nova_stage_latency_seconds_sum{{stage="{stage}"}} {histogram["sum"]}')
+        lines.append(f'nova_stage_latency_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+    lines.append("# HELP nova_stage_latency_quantile_seconds Recent latency percentiles for each stage.")
+    lines.append("# TYPE nova_stage_latency_quantile_seconds gauge")
+    for stage, histogram in sorted(snapshot.get("stages", {}).items()):
+        for quantile in ("p50", "p95", "p99"):
+            lines.append(f'nova_stage_latency_quantile_seconds{{stage="{stage}",quantile="0.{quantile[1:]}"}} {histogram[quantile]}')
+    lines.append("# HELP nova_stage_total Commands that passed through each stage, by outcome.")
+    lines.append("# TYPE nova_stage_total counter")
+    for counter in snapshot.get("counters", []):
+        lines.append(f'nova_stage_total{{stage="{counter["stage"]}",status="{counter["status"]}"}} {counter["value"]}')
+    if snapshot.get("updated"):
+        lines.append("# HELP nova_metrics_updated_timestamp_seconds When NOVA last wrote its metrics.")
+        lines.append("# TYPE nova_metrics_updated_timestamp_seconds gauge")
+        lines.append(f"nova_metrics_updated_timestamp_seconds {snapshot['updated']}")
+    return "\n".join(lines) + "\n"
+
+@app.route('/api/metrics', methods=['GET'])
+@login_required
+def api_metrics():
+    return render_prometheus(load_metrics()), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+# Client side of NOVA's command bus (length-prefixed JSON over a Unix socket, loopback TCP on Windows)
+BUS_HEADER = struct.Struct("!I")
+
+def bus_connect(timeout=5):
+    bus_config = config_store.get("command_bus", {})
+    if hasattr(socket, "AF_UNIX"):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        address = bus_config.get("path", os.path.join('instance', 'nova.sock'))
+    else:
+        connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        address = ("127.0.0.1", bus_config.get("port", 5056))
+    connection.settimeout(timeout)
+    try:
+        connection.connect(address)
+    except OSError:
+        connection.close()
+        raise
+    return connection
+
+def bus_key():
+    # Written by NOVA on its first start; every message must carry it
+    key_path = config_store.get("command_bus", {}).get("key_path", os.path.join('instance', 'nova-bus.key'))
+    with open(key_path) as key_file:
+        return key_file.read().strip()
+
+def bus_send(connection, payload):
+    data = json.dumps(dict(payload, key=bus_key())).encode('utf-8')
+    connection.sendall(BUS_HEADER.pack(len(data)) + data)
+
+def bus_receive(connection):
+    header = bus_receive_exactly(connection, BUS_HEADER.size)
+    if header is None:
+        return None
+    data = bus_receive_exactly(connection, BUS_HEADER.unpack(header)[0])
+    return json.loads(data) if data is not None else None
+
+def bus_receive_exactly(connection, size):
+    data = b''
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+@app.route('/api/command', methods=['POST'])
+@login_required
+def api_command():
+    data = request.get_json(silent=True) or {}
+    text = str(data.get('command', '')).strip()
+    if not text:
+        return jsonify({'error': 'No command given'}), 400
+    try:
+        connection = bus_connect()
+        try:
+            bus_send(connection, {'type': 'command', 'text': text, 'user_id': current_user.username})
+            reply = bus_receive(connection)
+        finally:
+            connection.close()
+    except OSError as e:
+        logging.error(f"Could not reach NOVA: {e}")
+        return jsonify({'error': 'NOVA is not running'}), 502
+    if reply is None:
+        return jsonify({'error': 'NOVA closed the connection'}), 502
+    if reply.get('type') == 'busy':
+        return jsonify({'error': 'NOVA is busy, try again shortly'}), 503, {'Retry-After': str(reply.get('retry_after', 1))}
+    if reply.get('type') != 'accepted':
+        return jsonify({'error': reply.get('error', 'Command rejected')}), 400
+    return jsonify({'command_id': reply['command_id']}), 202
+
+# Each open event stream holds a server thread, so streams get a fixed share of the pool
+frontend_config = config_store.get("frontend", {})
+server_threads = frontend_config.get("threads", 16)
+event_stream_slots = threading.BoundedSemaphore(min(frontend_config.get("max_event_streams", 4), max(1, server_threads // 2)))
+
+@app.route('/api/events')
+@login_required
+def api_events():
+    events = [event for event in request.args.get('events', '').split(',') if event]
+    if not event_stream_slots.acquire(blocking=False):
+        return jsonify({'error': 'Too many open event streams'}), 503, {'Retry-After': '30'}
+    connection = None
+    try:
+        connection = bus_connect()
+        bus_send(connection, {'type': 'subscribe', 'events': events})
+        reply = bus_receive(connection)
+        if not reply or reply.get('type') != 'subscribed':
+            raise ValueError(f"unexpected reply {reply}")
+    except BaseException as e:
+        # Until the response exists nothing else gives the slot back
+        if connection is not None:
+            connection.close()
+        event_stream_slots.release()
+        if isinstance(e, OSError):
+            logging.error(f"Could not reach NOVA: {e}")
+            return jsonify({'error': 'NOVA is not running'}), 502
+        if isinstance(e, ValueError):
+            logging.error(f"NOVA refused the event subscription: {e}")
+            return jsonify({'error': 'NOVA refused the subscription'}), 502
+        raise
+
+    def stream():
+        connection.settimeout(15)
+        try:
+            while True:
+                try:
+                    event = bus_receive(connection)
+                except socket.timeout:
+                    yield ': keep-alive\n\n'
+                    continue
+                if event is None:
+                    return
+                if event.get('type') != 'event':
+                    continue
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            connection.close()
+
+    released = []
+
+    def release_slot():
+        # Runs when the server closes the response, whether or not the stream was ever read
+        if not released:
+            released.append(True)
+            connection.close()
+            event_stream_slots.release()
+
+    response = Response(stream_with_context(stream()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(release_slot)
+    return response
+
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    logs = []
-    with open('logs/voiceme.log') as log_file:
-        logs = log_file.readlines()
-    
-    # Parse logs for levels and counts
-    parsed_logs = []
-    log_levels = ['INFO', 'WARNING', 'ERROR', 'DEBUG']
-    log_counts = Counter({level: 0 for level in log_levels})
-    
-    for log in logs:
-        parts = log.split(' - ')
-        if len(parts) > 2:
-            timestamp = parts[0]
-            level = parts[1]
-            message = ' - '.join(parts[2:])
-            if level in log_levels:
-                log_counts[level] += 1
-                parsed_logs.append({'timestamp': timestamp, 'level': level, 'message': message})
-    
-    return render_template('dashboard.html', logs=parsed_logs, log_counts=log_counts)
+    log_index.refresh()
+    level = request.args.get('level') or None
+    before = request.args.get('before', type=int)
+    per_page = min(request.args.get('per_page', 100, type=int), 500)
+    # The inputs send "YYYY-MM-DDTHH:MM"; log timestamps are "YYYY-MM-DD HH:MM:SS,mmm"
+    log_since = request.args.get('since') or None
+    log_until = request.args.get('until') or None
+    since_bound = log_since.replace('T', ' ') if log_since else None
+    until_bound = log_until.replace('T', ' ') if log_until else None
+    if until_bound and len(until_bound) == 16:
+        until_bound += ':59,999'
+    logs = log_index.query(level=level, since=since_bound, until=until_bound, before=before, limit=per_page)
+    next_before = logs[-1]['id'] if len(logs) == per_page else None
+    history_user = request.args.get('user') or None
+    since = datetime.datetime.now() - datetime.timedelta(days=request.args.get('days', 30, type=int))
+    return render_template('dashboard.html', logs=logs, log_counts=log_index.counts(),
+                           level=level, next_before=next_before, per_page=per_page,
+                           log_since=log_since, log_until=log_until,
+                           stage_metrics=load_metrics().get("stages", {}),
+                           history_user=history_user, history_users=CommandHistory.users(),
+                           top_commands=CommandHistory.top_commands(history_user, since),
+                           failure_rates=CommandHistory.failure_rates(history_user, since),
+                           latency_trend=CommandHistory.latency_trend(history_user))
+
+@app.route('/api/history', methods=['GET'])
+@login_required
+def api_history():
+    user_id = request.args.get('user') or None
+    days = request.args.get('days', 30, type=int)
+    since = datetime.datetime.now() - datetime.timedelta(days=days)
+    return jsonify({
+        'top_commands': CommandHistory.top_commands(user_id, since, limit=request.args.get('limit', 10, type=int)),
+        'failure_rates': CommandHistory.failure_rates(user_id, since),
+        'latency_trend': CommandHistory.latency_trend(user_id, days),
+    })
+
+@app.route('/admin/history/prune', methods=['POST'])
+@login_required
+def prune_history():
+    if current_user.username != 'admin':
+        return 'Unauthorized', 403
+    days = request.args.get('days', config_store.get('command_history', {}).get('retention_days', 90), type=int)
+    deleted = CommandHistory.prune(days)
+    logging.info(f"Pruned {deleted} command history rows older than {days} days")
+    return jsonify({'deleted': deleted})
 
 @app.route('/admin/restart', methods=['POST'])
 @login_required
@@ -391,6 +877,7 @@ def restart():
     if current_user.username != 'admin':
         return 'Unauthorized', 403
     logging.info("Restarting application...")
+    config_store.flush()
     os.execv(sys.executable, ['"{}"'.format(sys.executable)] + sys.argv)
     return redirect(url_for('index'))
 
@@ -399,8 +886,8 @@ def restart():
 def customize_voice():
     if request.method == 'POST':
         voice_id = request.form['voice_id']
-        config['voice_id'] = voice_id
-        save_config()
+        with config_store.mutate() as config:
+            config['voice_id'] = voice_id
         flash('Voice settings updated.', 'success')
         return redirect(url_for('index'))
     return render_template('customize_voice.html', voices=get_available_voices())
@@ -430,6 +917,6 @@ if __name__ == "__main__":
     try:
         from waitress import serve
         logging.info("Starting server on 127.0.0.1:8000")
-        serve(app, host="127.0.0.1", port=8000)
+        serve(app, host="127.0.0.1", port=8000, threads=server_threads)
     except Exception as e:
         logging.error(f"Error starting server: {e}")
@@ -1,54 +1,914 @@
+import time
+startup_started = time.perf_counter()
+
 import json
-import speech_recognition as sr
+import argparse
 import subprocess
-import pyttsx3
+import sys
+import shutil
+from urllib.parse import quote_plus
 import os
-import openai
-import pyautogui
-import time
+import importlib
 from datetime import datetime, timedelta
 import logging
+import logging.handlers
+import atexit
 import threading
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+import queue
+import re
+import difflib
+import hashlib
+import sqlite3
+import heapq
+import io
+import mmap
+import math
+import array
+import itertools
+import random
+import socket
+import struct
+import secrets
+import hmac
+from collections import OrderedDict, deque
+from contextlib import contextmanager, redirect_stdout
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-# Setup logging
-logging.basicConfig(level=logging.DEBUG, filename='logs/Nova.log', filemode='a',
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+try:
+    import winsound
+except ImportError:
+    winsound = None
+
+try:
+    import simpleaudio
+except ImportError:
+    simpleaudio = None
+
+try:
+    import webrtcvad
+except ImportError:
+    webrtcvad = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import pyperclip
+except ImportError:
+    pyperclip = None
 
 # Load configuration
+config_started = time.perf_counter()
 with open('config.json') as config_file:
     config = json.load(config_file)
+config_finished = time.perf_counter()
 
-# Initialize pyttsx3 engine
-engine = pyttsx3.init()
-engine_lock = threading.Lock()
+class DebugRateLimit(logging.Filter):
+    # Caps DEBUG records per second (and optionally samples them) so chatty paths cannot flood the writer
+    def __init__(self, per_second=50, sample_rate=1.0):
+        super().__init__()
+        self.per_second = per_second
+        self.sample_rate = sample_rate
+        self.window = int(time.time())
+        self.passed = 0
+        self.suppressed = 0
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.suppressed += 1
+            return False
+        window = int(time.time())
+        if window != self.window:
+            self.window = window
+            self.passed = 0
+        if self.per_second is not None and self.passed >= self.per_second:
+            self.suppressed += 1
+            return False
+        self.passed += 1
+        return True
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class StructuredLogWriter:
+    # Single background writer that batches records into JSON lines and rotates by size
+    def __init__(self, log_queue, path, max_bytes=5000000, backup_count=5, batch_size=256, flush_interval=0.2):
+        self.queue = log_queue
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sources = []
+        self.reported = {}
+        self.thread = None
+        self.stopping = object()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="nova-log-writer", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2):
+        if self.thread is not None:
+            self.queue.put(self.stopping)
+            self.thread.join(timeout)
+            self.thread = None
+
+    @staticmethod
+    def to_json(record):
+        entry = {
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.created)) + f",{int(record.msecs):03d}",
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key in ("command_id", "user_id", "stage", "duration_ms"):
+            if hasattr(record, key):
+                entry[key] = getattr(record, key)
+        return json.dumps(entry, default=str)
+
+    def _drop_report(self):
+        # Turn counters from the filter and handler into a WARNING line
+        lines = []
+        for name, source, attribute in self.sources:
+            total = getattr(source, attribute)
+            new = total - self.reported.get(name, 0)
+            if new:
+                self.reported[name] = total
+                lines.append(json.dumps({"timestamp": time.strftime("%Y-%m-%d %H:%M:%S") + ",000", "level": "WARNING",
+                                         "message": f"{new} log records {name}", "thread": "nova-log-writer"}))
+        return lines
+
+    def _rotate(self, log_file):
+        log_file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backup_count:
+            os.replace(self.path, f"{self.path}.1")
+        return open(self.path, "a", encoding="utf-8")
+
+    def _run(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        log_file = open(self.path, "a", encoding="utf-8")
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            lines = []
+            for record in batch:
+                if record is self.stopping:
+                    stopping = True
+                    continue
+                try:
+                    lines.append(self.to_json(record))
+                except Exception:
+                    continue
+            lines.extend(self._drop_report())
+            if lines:
+                log_file.write("\n".join(lines) + "\n")
+                log_file.flush()
+                if self.max_bytes and log_file.tell() >= self.max_bytes:
+                    log_file = self._rotate(log_file)
+        log_file.close()
+
+# Setup logging
+logging_config = config.get("logging", {})
+log_queue = queue.Queue(maxsize=logging_config.get("queue_size", 10000))
+log_handler = NonBlockingQueueHandler(log_queue)
+log_handler.setFormatter(logging.Formatter('%(message)s'))
+debug_rate_limit = DebugRateLimit(per_second=logging_config.get("debug_per_second", 50),
+                                  sample_rate=logging_config.get("debug_sample_rate", 1.0))
+log_handler.addFilter(debug_rate_limit)
+logging.basicConfig(level=logging.DEBUG, handlers=[log_handler])
+log_writer = StructuredLogWriter(log_queue, logging_config.get("path", 'logs/Nova.log'),
+                                 max_bytes=logging_config.get("max_bytes", 5000000),
+                                 backup_count=logging_config.get("backup_count", 5))
+log_writer.sources = [("dropped because the log queue was full", log_handler, "dropped"),
+                      ("suppressed by the DEBUG rate limit", debug_rate_limit, "suppressed")]
+log_writer.start()
+atexit.register(log_writer.stop)
+
+# Startup timing
+startup_phases = []
+
+def record_startup_phase(name, started, finished=None):
+    elapsed = (finished or time.perf_counter()) - started
+    startup_phases.append((name, elapsed))
+    logging.info(f"Startup phase '{name}' took {elapsed * 1000:.1f} ms")
+
+def startup_report():
+    lines = [f"  {name:<32} {elapsed * 1000:8.1f} ms" for name, elapsed in list(startup_phases)]
+    return "Startup timing:\n" + "\n".join(lines)
+
+# Per-stage latency metrics
+command_trace = threading.local()
+command_ids = itertools.count(1)
+
+def begin_command():
+    command_trace.id = f"{os.getpid():x}-{next(command_ids):06x}"
+    return command_trace.id
+
+def current_command_id():
+    return getattr(command_trace, "id", None)
+
+class MetricsStore:
+    # Fixed-bucket histograms and counters per stage, plus a bounded sample for percentiles.
+    # A snapshot is written to disk periodically so the front-end can serve it.
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, path=None, interval=5, sample_size=1000):
+        self.path = path
+        self.interval = interval
+        self.sample_size = sample_size
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def observe(self, stage, seconds, status="ok"):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = {
+                    "buckets": [0] * (len(self.BUCKETS) + 1), "sum": 0.0, "count": 0,
+                    "samples": deque(maxlen=self.sample_size)}
+            index = 0
+            while index < len(self.BUCKETS) and seconds > self.BUCKETS[index]:
+                index += 1
+            histogram["buckets"][index] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+            histogram["samples"].append(seconds)
+            key = (stage, status)
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    @contextmanager
+    def span(self, stage):
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe(stage, elapsed, status)
+            logging.debug(f"Stage {stage} took {elapsed * 1000:.1f} ms",
+                          extra={"command_id": current_command_id(), "stage": stage,
+                                 "duration_ms": round(elapsed * 1000, 2)})
+
+    def snapshot(self):
+        with self.lock:
+            stages = {}
+            for stage, histogram in self.histograms.items():
+                samples = sorted(histogram["samples"])
+                stages[stage] = {
+                    "buckets": list(histogram["buckets"]),
+                    "sum": histogram["sum"],
+                    "count": histogram["count"],
+                    "p50": samples[int(len(samples) * 0.50)] if samples else 0.0,
+                    "p95": samples[int(len(samples) * 0.95)] if samples else 0.0,
+                    "p99": samples[int(len(samples) * 0.99)] if samples else 0.0,
+                }
+            counters = [{"stage": stage, "status": status, "value": value}
+                        for (stage, status), value in self.counters.items()]
+        return {"updated": time.time(), "bucket_bounds": list(self.BUCKETS), "stages": stages, "counters": counters}
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as metrics_file:
+            json.dump(self.snapshot(), metrics_file)
+        os.replace(temp_path, self.path)
+
+    def start(self):
+        if self.path and self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="nova-metrics", daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.save()
+            except Exception as e:
+                logging.error(f"Error saving metrics: {e}")
+
+metrics_config = config.get("metrics", {})
+metrics = MetricsStore(path=metrics_config.get("path", os.path.join("instance", "metrics.json")) if metrics_config.get("enabled", True) else None,
+                       interval=metrics_config.get("interval", 5))
+
+class CommandHistoryWriter:
+    # Collects one row per command (parse and execute may run on different threads, keyed by command ID)
+    # and writes them to the front-end's command_history table in batched transactions
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS command_history (id INTEGER PRIMARY KEY, user_id VARCHAR(80) NOT NULL, "
+        "command_id VARCHAR(40), source VARCHAR(16), command TEXT NOT NULL, action TEXT, handler VARCHAR(80), "
+        "success BOOLEAN NOT NULL, error TEXT, parse_ms FLOAT, execute_ms FLOAT, total_ms FLOAT, created_at DATETIME NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS ix_command_history_user_created ON command_history (user_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_command_history_user_handler ON command_history (user_id, handler)",
+        "CREATE INDEX IF NOT EXISTS ix_command_history_created ON command_history (created_at)",
+    ]
+    COLUMNS = ("user_id", "command_id", "source", "command", "action", "handler", "success", "error",
+               "parse_ms", "execute_ms", "total_ms", "created_at")
+
+    def __init__(self, path, batch_size=100, flush_interval=2, max_buffer=10000, retention_days=90, max_open=1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.retention_days = retention_days
+        self.max_open = max_open
+        self.open_records = OrderedDict()
+        self.buffer = deque()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.written = 0
+        self.dropped = 0
+        self.pruned = 0
+
+    def note_parse(self, command_id, user_id, command, action, parse_ms):
+        if not self.path or command_id is None:
+            return
+        record = {"user_id": user_id, "command_id": command_id, "source": "bus" if command_id.startswith("bus-") else "voice",
+                  "command": command, "action": action, "parse_ms": parse_ms,
+                  "created_at": datetime.now(), "started": time.perf_counter()}
+        if not action:
+            self._finish(record, handler=None, error="could not parse command", execute_ms=None)
+            return
+        with self.condition:
+            self.open_records[command_id] = record
+            while len(self.open_records) > self.max_open:
+                self.open_records.popitem(last=False)
+
+    def note_execute(self, command_id, handler, error, execute_ms):
+        if not self.path or command_id is None:
+            return
+        with self.condition:
+            record = self.open_records.pop(command_id, None)
+        if record is not None:
+            self._finish(record, handler, error, execute_ms)
+
+    def _finish(self, record, handler, error, execute_ms):
+        started = record.pop("started")
+        record.update(handler=handler, error=error, success=error is None, execute_ms=execute_ms,
+                      total_ms=round((time.perf_counter() - started) * 1000, 2),
+                      created_at=record["created_at"].strftime("%Y-%m-%d %H:%M:%S.%f"))
+        with self.condition:
+            if len(self.buffer) >= self.max_buffer:
+                self.buffer.popleft()
+                self.dropped += 1
+            self.buffer.append(tuple(record[column] for column in self.COLUMNS))
+            if len(self.buffer) >= self.batch_size:
+                self.condition.notify()
+        if self.thread is None:
+            self.start()
+
+    def start(self):
+        with self.condition:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self._run, name="nova-history", daemon=True)
+        self.thread.start()
+
+    def connect(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=10)
+        # WAL lets the dashboard read while NOVA writes
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            db.execute(statement)
+        db.commit()
+        return db
+
+    def _take_batch(self):
+        with self.condition:
+            batch = list(self.buffer)
+            self.buffer.clear()
+        return batch
+
+    def _write(self, db, batch):
+        placeholders = ", ".join("?" for _ in self.COLUMNS)
+        with db:
+            db.executemany(f"INSERT INTO command_history ({', '.join(self.COLUMNS)}) VALUES ({placeholders})", batch)
+        self.written += len(batch)
+
+    def prune(self, db, chunk_size=5000):
+        # Delete in chunks so a large backlog never holds the write lock for long
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime("%Y-%m-%d %H:%M:%S.%f")
+        total = 0
+        while True:
+            with db:
+                deleted = db.execute("DELETE FROM command_history WHERE id IN (SELECT id FROM command_history "
+                                     "WHERE created_at < ? ORDER BY created_at LIMIT ?)", (cutoff, chunk_size)).rowcount
+            total += deleted
+            if deleted < chunk_size:
+                break
+        if total:
+            self.pruned += total
+            logging.info(f"Pruned {total} command history rows older than {self.retention_days} days")
+        return total
+
+    def _run(self):
+        try:
+            db = self.connect()
+        except sqlite3.Error as e:
+            logging.error(f"Could not open the command history database: {e}")
+            return
+        last_prune = 0
+        while True:
+            with self.condition:
+                if len(self.buffer) < self.batch_size:
+                    self.condition.wait(self.flush_interval)
+            batch = self._take_batch()
+            try:
+                if batch:
+                    self._write(db, batch)
+                if self.retention_days and time.time() - last_prune > 3600:
+                    last_prune = time.time()
+                    self.prune(db)
+            except sqlite3.Error as e:
+                logging.error(f"Error writing command history: {e}")
+
+    def flush(self):
+        batch = self._take_batch()
+        if batch and self.path:
+            db = self.connect()
+            try:
+                self._write(db, batch)
+            finally:
+                db.close()
+
+    def stats(self):
+        with self.condition:
+            return {"written": self.written, "buffered": len(self.buffer), "open": len(self.open_records),
+                    "dropped": self.dropped, "pruned": self.pruned}
+
+history_config = config.get("command_history", {})
+command_history = CommandHistoryWriter(
+    path=history_config.get("database", os.path.join("instance", "users.db")) if history_config.get("enabled", True) else None,
+    batch_size=history_config.get("batch_size", 100),
+    flush_interval=history_config.get("flush_interval", 2),
+    retention_days=history_config.get("retention_days", 90))
+
+class LazyLoader:
+    # Defers an import or initialization until the first attribute access
+    def __init__(self, name, loader):
+        self._name = name
+        self._loader = loader
+        self._target = None
+        self._lock = threading.Lock()
+
+    def preload(self):
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    started = time.perf_counter()
+                    self._target = self._loader()
+                    record_startup_phase(self._name, started)
+        return self._target
+
+    def __getattr__(self, attr):
+        return getattr(self.preload(), attr)
+
+def lazy_import(module_name, configure=None):
+    def load():
+        module = importlib.import_module(module_name)
+        if configure is not None:
+            configure(module)
+        return module
+    return LazyLoader(f"import {module_name}", load)
 
-# Set OpenAI API key
-openai.api_key = config["openai_api_key"]
+record_startup_phase("import standard modules", startup_started, config_started)
+record_startup_phase("load configuration", config_started, config_finished)
+record_startup_phase("start logging", config_finished)
+
+def configure_openai(module):
+    # Set OpenAI API key
+    module.api_key = config["openai_api_key"]
+    if config.get("openai_api_base"):
+        module.api_base = config["openai_api_base"]
+
+sr = lazy_import("speech_recognition")
+pyttsx3 = lazy_import("pyttsx3")
+openai = lazy_import("openai", configure=configure_openai)
+pyautogui = lazy_import("pyautogui")
+service_account = lazy_import("google.oauth2.service_account")
+discovery = lazy_import("googleapiclient.discovery")
+googleapiclient_http = lazy_import("googleapiclient.http")
+
+# Initialize pyttsx3 engine on first use
+def init_engine():
+    new_engine = pyttsx3.init()
+    if config.get("voice_id"):
+        new_engine.setProperty('voice', config["voice_id"])
+    return new_engine
+
+engine = LazyLoader("initialize text-to-speech", init_engine)
+engine_lock = threading.Lock()
 
 # Initialize Google Calendar API
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 SERVICE_ACCOUNT_FILE = 'service_account.json'
 
-credentials = service_account.Credentials.from_service_account_file(
-    SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-calendar_service = build('calendar', 'v3', credentials=credentials)
+calendar_service = None
+calendar_service_lock = threading.Lock()
+
+def get_calendar_service():
+    # Built on first use so startup does not need the credentials file or a network connection
+    global calendar_service
+    with calendar_service_lock:
+        if calendar_service is None:
+            credentials_file = config.get("google_credentials", SERVICE_ACCOUNT_FILE)
+            api_endpoint = config.get("calendar", {}).get("api_endpoint")
+            if api_endpoint and not os.path.exists(credentials_file):
+                from google.auth.credentials import AnonymousCredentials
+                credentials = AnonymousCredentials()
+            else:
+                credentials = service_account.Credentials.from_service_account_file(credentials_file, scopes=SCOPES)
+            client_options = {"api_endpoint": api_endpoint} if api_endpoint else None
+            calendar_service = discovery.build('calendar', 'v3', credentials=credentials,
+                                               client_options=client_options, cache_discovery=False)
+        return calendar_service
 
 # Initialize voice profiles
 voice_profiles = {}
 
 class ContextManager:
-    def __init__(self):
-        self.context = {}
+    def __init__(self, max_users=100, max_turns=20, token_budget=800, path=None, snapshot_interval=30):
+        self.max_users = max_users
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.users = OrderedDict()
+        self.lock = threading.Lock()
+        self.db = None
+        self.db_lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS context "
+                            "(user_id TEXT PRIMARY KEY, facts TEXT NOT NULL, turns TEXT NOT NULL, updated_at REAL NOT NULL)")
+            self.db.commit()
+            threading.Thread(target=self._snapshot_loop, args=(snapshot_interval,), name="nova-context", daemon=True).start()
+
+    def _load(self, user_id):
+        facts, turns = {}, []
+        if self.db is not None:
+            with self.db_lock:
+                row = self.db.execute("SELECT facts, turns FROM context WHERE user_id = ?", (user_id,)).fetchone()
+            if row:
+                facts, turns = json.loads(row[0]), json.loads(row[1])
+        return {"lock": threading.RLock(), "facts": facts, "turns": deque(turns, maxlen=self.max_turns), "dirty": False}
+
+    def _entry(self, user_id):
+        with self.lock:
+            entry = self.users.get(user_id)
+            if entry is None:
+                entry = self.users[user_id] = self._load(user_id)
+            self.users.move_to_end(user_id)
+            evicted = []
+            while len(self.users) > self.max_users:
+                evicted.append(self.users.popitem(last=False))
+        for evicted_id, evicted_entry in evicted:
+            self._save(evicted_id, evicted_entry)
+        return entry
 
     def update_context(self, user_id, context):
-        self.context[user_id] = context
+        entry = self._entry(user_id)
+        with entry["lock"]:
+            entry["facts"].update(context)
+            entry["dirty"] = True
 
     def get_context(self, user_id):
-        return self.context.get(user_id, {})
+        entry = self._entry(user_id)
+        with entry["lock"]:
+            return dict(entry["facts"])
+
+    def add_turn(self, user_id, command, action):
+        entry = self._entry(user_id)
+        with entry["lock"]:
+            entry["turns"].append({"command": command, "action": action})
+            entry["dirty"] = True
+
+    @staticmethod
+    def estimate_tokens(text):
+        return len(text) // 4 + 1
+
+    def render_context(self, user_id, token_budget=None):
+        # Facts get at most half the budget; the newest turns fill the rest
+        budget = token_budget or self.token_budget
+        entry = self._entry(user_id)
+        with entry["lock"]:
+            facts = dict(entry["facts"])
+            turns = list(entry["turns"])
+        lines = []
+        used = 0
+        facts_budget = budget // 2
+        for key, value in facts.items():
+            line = f"{key}: {value}"
+            cost = self.estimate_tokens(line)
+            if used + cost > facts_budget:
+                room = (facts_budget - used - 1) * 4 - 3
+                if room <= 0:
+                    continue
+                line = line[:room] + "..."
+                cost = self.estimate_tokens(line)
+            lines.append(line)
+            used += cost
+        history = []
+        for turn in reversed(turns):
+            line = f"- {turn['command']} -> {turn['action']}"
+            cost = self.estimate_tokens(line)
+            if used + cost > budget:
+                break
+            history.append(line)
+            used += cost
+        if history:
+            lines.append("Recent commands:")
+            lines.extend(reversed(history))
+        return "\n".join(lines)
+
+    def _save(self, user_id, entry):
+        if self.db is None:
+            return
+        with entry["lock"]:
+            if not entry["dirty"]:
+                return
+            facts = json.dumps(entry["facts"], default=str)
+            turns = json.dumps(list(entry["turns"]), default=str)
+            entry["dirty"] = False
+        try:
+            with self.db_lock:
+                self.db.execute("INSERT OR REPLACE INTO context (user_id, facts, turns, updated_at) VALUES (?, ?, ?, ?)",
+                                (user_id, facts, turns, time.time()))
+                self.db.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Could not save context for {user_id}: {e}")
+
+    def snapshot(self):
+        with self.lock:
+            entries = list(self.users.items())
+        for user_id, entry in entries:
+            self._save(user_id, entry)
+
+    def _snapshot_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            self.snapshot()
+
+context_config = config.get("context", {})
+context_manager = ContextManager(max_users=context_config.get("max_users", 100),
+                                 max_turns=context_config.get("max_turns", 20),
+                                 token_budget=context_config.get("token_budget", 800),
+                                 path=context_config.get("path", os.path.join("instance", "context.db")),
+                                 snapshot_interval=context_config.get("snapshot_interval", 30))
+
+def normalize_command(text):
+    return " ".join(re.sub(r"[^a-z0-9' ]+", " ", text.lower()).replace("'", "").split())
+
+class IntentIndex:
+    LEADING_FILLERS = [("hey",), ("nova",), ("please",), ("can", "you"), ("could", "you"), ("would", "you")]
+    OPEN_VERBS = ["open", "launch", "start", "run"]
+    CLOSE_VERBS = ["close", "quit", "exit", "kill"]
+    # Actions that end or take over the session; a near miss must not trigger them
+    EXACT_ONLY_ACTIONS = {"stop listening", "start personal log"}
+    FIXED_PHRASES = {
+        "current time": "current time",
+        "what time is it": "current time",
+        "whats the time": "current time",
+        "whats the current time": "current time",
+        "tell me the time": "current time",
+        "start personal log": "start personal log",
+        "start a personal log": "start personal log",
+        "personal log": "start personal log",
+        "stop listening": "stop listening",
+        "running programs": "running programs",
+        "what programs are running": "running programs",
+        "list running programs": "running programs",
+    }
+    ARGUMENT_VERBS = {
+        "search": "search",
+        "search for": "search",
+        "look up": "search",
+        "set reminder": "set reminder",
+        "set a reminder": "set reminder",
+        "set reminder to": "set reminder",
+        "set a reminder to": "set reminder",
+        "remind me to": "set reminder",
+        "find log": "find log",
+        "find my log about": "find log",
+        "find my logs about": "find log",
+        "find my log on": "find log",
+        "find the log about": "find log",
+        "search my logs for": "find log",
+        "what did i log about": "find log",
+    }
+
+    def __init__(self, fuzzy_cutoff=0.88):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.phrases = {}
+        self.fuzzy_phrases = []
+        self.verb_trie = {}
+        self.stale = True
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+    def invalidate(self):
+        self.stale = True
+
+    def rebuild(self):
+        phrases = {normalize_command(k): v for k, v in self.FIXED_PHRASES.items()}
+        for program in config.get("program_mapping", {}):
+            name = normalize_command(program)
+            for verb in self.OPEN_VERBS:
+                phrases[f"{verb} {name}"] = phrases[f"{verb} the {name}"] = f"open {program}"
+            for verb in self.CLOSE_VERBS:
+                phrases[f"{verb} {name}"] = phrases[f"{verb} the {name}"] = f"close {program}"
+        for verb, takes_argument in command_registry.verbs().items():
+            if not takes_argument:
+                phrases.setdefault(verb, verb)
+        for command, action in config.get("custom_commands", {}).items():
+            phrases[normalize_command(command)] = action
+
+        verb_trie = {}
+        for verb, action_verb in self.ARGUMENT_VERBS.items():
+            node = verb_trie
+            for token in verb.split():
+                node = node.setdefault(token, {})
+            node[None] = action_verb
+
+        self.phrases = phrases
+        self.fuzzy_phrases = [phrase for phrase, action in phrases.items() if self.allows_fuzzy(action)]
+        self.verb_trie = verb_trie
+        logging.debug(f"Intent index rebuilt with {len(phrases)} phrases")
+
+    def allows_fuzzy(self, action):
+        return action not in self.EXACT_ONLY_ACTIONS and action.split(" ", 1)[0] != "close"
+
+    def _strip_fillers(self, tokens):
+        stripped = True
+        while stripped and tokens:
+            stripped = False
+            for filler in self.LEADING_FILLERS:
+                if tuple(tokens[:len(filler)]) == filler:
+                    tokens = tokens[len(filler):]
+                    stripped = True
+        if tokens and tokens[-1] == "please":
+            tokens = tokens[:-1]
+        return tokens
+
+    def _match_argument_verb(self, tokens):
+        node = self.verb_trie
+        best = None
+        for i, token in enumerate(tokens):
+            node = node.get(token)
+            if node is None:
+                break
+            if None in node and i + 1 < len(tokens):
+                best = (node[None], i + 1)
+        if best:
+            action_verb, consumed = best
+            return f"{action_verb} {' '.join(tokens[consumed:])}"
+        return None
+
+    def match(self, command):
+        with self.lock:
+            if self.stale:
+                self.stale = False
+                self.rebuild()
+
+        tokens = self._strip_fillers(normalize_command(command).split())
+        text = " ".join(tokens)
+        action = self.phrases.get(text) or self._match_argument_verb(tokens)
+        if action:
+            self.hits += 1
+            return action
+
+        close = difflib.get_close_matches(text, self.fuzzy_phrases, n=1, cutoff=self.fuzzy_cutoff)
+        if close:
+            self.hits += 1
+            self.fuzzy_hits += 1
+            return self.phrases[close[0]]
+
+        self.misses += 1
+        return None
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+intent_index = IntentIndex(fuzzy_cutoff=config.get("intent_matcher", {}).get("fuzzy_cutoff", 0.88))
+
+class ResponseCache:
+    def __init__(self, max_entries=512, ttl_seconds=86400, path=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_used = 0
+        self.db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS response_cache "
+                            "(key TEXT PRIMARY KEY, action TEXT NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL)")
+            self.db.execute("DELETE FROM response_cache WHERE expires_at < ?", (time.time(),))
+            self.db.commit()
+            rows = self.db.execute("SELECT key, action, expires_at FROM response_cache "
+                                   "ORDER BY last_used DESC LIMIT ?", (max_entries,)).fetchall()
+            for key, action, expires_at in reversed(rows):
+                self._store(key, action, expires_at)
 
-context_manager = ContextManager()
+    @staticmethod
+    def make_key(command, context):
+        digest = hashlib.sha256(json.dumps(context, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        return f"{normalize_command(command)}|{digest}"
+
+    @staticmethod
+    def _entry_size(key, action):
+        return len(key.encode("utf-8")) + len(action.encode("utf-8"))
+
+    def _store(self, key, action, expires_at):
+        if key in self.entries:
+            self.bytes_used -= self._entry_size(key, self.entries.pop(key)[0])
+        self.entries[key] = (action, expires_at)
+        self.bytes_used += self._entry_size(key, action)
+        while len(self.entries) > self.max_entries:
+            old_key, (old_action, _) = self.entries.popitem(last=False)
+            self.bytes_used -= self._entry_size(old_key, old_action)
+            if self.db is not None:
+                self.db.execute("DELETE FROM response_cache WHERE key = ?", (old_key,))
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] < time.time():
+                if entry is not None:
+                    del self.entries[key]
+                    self.bytes_used -= self._entry_size(key, entry[0])
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, action):
+        now = time.time()
+        with self.lock:
+            self._store(key, action, now + self.ttl_seconds)
+            if self.db is not None:
+                try:
+                    self.db.execute("INSERT OR REPLACE INTO response_cache (key, action, expires_at, last_used) "
+                                    "VALUES (?, ?, ?, ?)", (key, action, now + self.ttl_seconds, now))
+                    self.db.commit()
+                except sqlite3.Error as e:
+                    logging.error(f"Could not persist response cache entry: {e}")
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "bytes_used": self.bytes_used,
+        }
+
+response_cache_config = config.get("response_cache", {})
+response_cache = ResponseCache(max_entries=response_cache_config.get("max_entries", 512),
+                               ttl_seconds=response_cache_config.get("ttl_seconds", 86400),
+                               path=response_cache_config.get("path"))
 
 def list_voices():
     voices = engine.getProperty('voices')
@@ -57,32 +917,651 @@ def list_voices():
         print(f"ID: {voice.id}\nName: {voice.name}\nLanguages: {voice.languages}\nGender: {voice.gender}\n")
 
 def set_voice(voice_id):
-    engine.setProperty('voice', voice_id)
+    with engine_lock:
+        engine.setProperty('voice', voice_id)
+    if phrase_cache_enabled:
+        phrase_cache.set_voice(voice_id)
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+class SpeechWorker:
+    def __init__(self, max_queue=16, max_age=15):
+        self.max_queue = max_queue
+        self.max_age = max_age
+        self.pending = []
+        self.condition = threading.Condition()
+        self.sequence = itertools.count()
+        self.current = None
+        self.cancel_requested = False
+        self.thread = None
+        self.spoken = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.cancelled = 0
+        self.latencies = deque(maxlen=200)
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="nova-tts", daemon=True)
+        self.thread.start()
+
+    def _on_word(self, name, location, length):
+        if self.cancel_requested:
+            engine.stop()
+
+    def say(self, text, priority=PRIORITY_NORMAL, group=None):
+        # Messages in a group (the sentences of one streamed reply) are never merged, aged out or dropped
+        with self.condition:
+            for i, (queued_priority, seq, queued_text, enqueued_at, command_id, queued_group) in enumerate(self.pending):
+                if group is None and queued_group is None and queued_text == text:
+                    self.coalesced += 1
+                    if priority < queued_priority:
+                        self.pending[i] = (priority, seq, queued_text, enqueued_at, command_id, queued_group)
+                        heapq.heapify(self.pending)
+                    return
+            droppable = [item for item in self.pending if item[5] is None]
+            if len(self.pending) >= self.max_queue and droppable:
+                # Backpressure: make room by dropping the least important, most recent message
+                victim = max(droppable)
+                if victim[0] < priority and group is None:
+                    self.dropped += 1
+                    logging.warning(f"Speech queue full, dropping: {text}")
+                    return
+                self.pending.remove(victim)
+                heapq.heapify(self.pending)
+                self.dropped += 1
+                logging.warning(f"Speech queue full, dropping: {victim[2]}")
+            heapq.heappush(self.pending, (priority, next(self.sequence), text, time.time(), current_command_id(), group))
+            if self.current is not None and priority < self.current[0]:
+                self.cancel_requested = True
+            self.condition.notify_all()
+
+    def _run(self):
+        try:
+            engine.connect('started-word', self._on_word)
+        except Exception as e:
+            logging.error(f"Could not initialize text-to-speech: {e}")
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                priority, _, text, enqueued_at, command_trace.id, group = heapq.heappop(self.pending)
+                self.condition.notify_all()
+                if group is None and self.max_age and time.time() - enqueued_at > self.max_age:
+                    self.dropped += 1
+                    logging.debug(f"Dropping stale speech: {text}")
+                    self.condition.notify_all()
+                    continue
+                self.current = (priority, text)
+                self.cancel_requested = False
+            self.latencies.append(time.time() - enqueued_at)
+            buffer = phrase_cache.lookup(text) if phrase_cache_enabled else None
+            with engine_lock:
+                try:
+                    logging.debug(f"Speaking: {text}")
+                    with metrics.span("speak"):
+                        if buffer is None or not play_cached_audio(buffer):
+                            engine.say(text)
+                            engine.runAndWait()
+                    logging.debug(f"Finished speaking: {text}")
+                except Exception as e:
+                    logging.error(f"Error in speak: {e}")
+            with self.condition:
+                if self.cancel_requested:
+                    self.cancelled += 1
+                    logging.debug(f"Interrupted speech: {text}")
+                else:
+                    self.spoken += 1
+                self.current = None
+                self.cancel_requested = False
+                self.condition.notify_all()
+
+    def wait_for_group(self, group, max_pending=2):
+        # Lets a producer run at most a couple of sentences ahead of what is being spoken
+        with self.condition:
+            while sum(1 for item in self.pending if item[5] == group) >= max_pending:
+                self.condition.wait()
+
+    def flush(self, timeout=None):
+        deadline = time.time() + timeout if timeout else None
+        with self.condition:
+            while self.pending or self.current is not None:
+                remaining = deadline - time.time() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def stats(self):
+        with self.condition:
+            latencies = sorted(self.latencies)
+            return {
+                "queue_depth": len(self.pending),
+                "spoken": self.spoken,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "cancelled": self.cancelled,
+                "latency_avg": sum(latencies) / len(latencies) if latencies else 0.0,
+                "latency_p95": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+            }
+
+class PhraseCache:
+    FIXED_PHRASES = [
+        "Hello, I am ready for your command",
+        "I didn't catch that. Could you please repeat?",
+        "Error parsing command.",
+        "Command not recognized. Please try again.",
+        "Please dictate your personal log.",
+        "Personal log entry created.",
+        "Here is the code you requested.",
+        "Reminder has been set.",
+        "Could not set the reminder.",
+        "There was an error. Restarting listening.",
+        "Goodbye!",
+    ]
+    PROGRAM_TEMPLATES = ["Opening {program}"]
+
+    def __init__(self, directory="cache/phrases"):
+        self.directory = directory
+        self.voice_id = None
+        self.buffers = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def available():
+        return winsound is not None or simpleaudio is not None
 
-def speak(text):
-    def run():
-        with engine_lock:
+    def phrases(self):
+        phrases = list(self.FIXED_PHRASES)
+        for program in config.get("program_mapping", {}):
+            phrases.extend(template.format(program=program) for template in self.PROGRAM_TEMPLATES)
+        return phrases
+
+    def _path(self, voice_id, text):
+        digest = hashlib.sha256(f"{voice_id}\0{text}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.wav")
+
+    def set_voice(self, voice_id):
+        with self.lock:
+            if voice_id == self.voice_id:
+                return
+            self.voice_id = voice_id
+            for buffer in self.buffers.values():
+                buffer.close()
+            self.buffers = {}
+        threading.Thread(target=self.render_all, args=(voice_id,), name="nova-phrase-cache", daemon=True).start()
+
+    def render_all(self, voice_id):
+        os.makedirs(self.directory, exist_ok=True)
+        rendered = 0
+        for text in self.phrases():
+            if voice_id != self.voice_id:
+                return
+            path = self._path(voice_id, text)
             try:
-                logging.debug(f"Speaking: {text}")
-                engine.say(text)
-                engine.runAndWait()
-                logging.debug(f"Finished speaking: {text}")
+                if not os.path.exists(path):
+                    temp_path = f"{path}.tmp.wav"
+                    with engine_lock:
+                        engine.save_to_file(text, temp_path)
+                        engine.runAndWait()
+                    os.replace(temp_path, path)
+                    rendered += 1
+                with open(path, "rb") as audio_file:
+                    buffer = mmap.mmap(audio_file.fileno(), 0, access=mmap.ACCESS_READ)
+                with self.lock:
+                    if voice_id != self.voice_id:
+                        buffer.close()
+                        return
+                    self.buffers[text] = buffer
             except Exception as e:
-                logging.error(f"Error in speak: {e}")
-    threading.Thread(target=run).start()
+                logging.error(f"Could not render phrase '{text}': {e}")
+        logging.info(f"Phrase cache ready: {len(self.buffers)} phrases, {rendered} newly rendered")
 
-def recognize_speech():
+    def lookup(self, text):
+        with self.lock:
+            return self.buffers.get(text)
+
+def play_cached_audio(buffer):
+    if winsound is not None:
+        winsound.PlaySound(buffer, winsound.SND_MEMORY)
+        return True
+    if simpleaudio is not None:
+        simpleaudio.WaveObject.from_wave_file(io.BytesIO(buffer)).play().wait_done()
+        return True
+    return False
+
+phrase_cache_config = config.get("phrase_cache", {})
+phrase_cache = PhraseCache(directory=phrase_cache_config.get("directory", "cache/phrases"))
+phrase_cache_enabled = phrase_cache_config.get("enabled", True) and PhraseCache.available()
+
+tts_config = config.get("tts", {})
+speech_worker = SpeechWorker(max_queue=tts_config.get("max_queue", 16), max_age=tts_config.get("max_age", 15))
+
+speech_enabled = True
+
+def speak(text, priority=PRIORITY_NORMAL, group=None):
+    if not speech_enabled:
+        logging.debug(f"Speech disabled, not saying: {text}")
+        return
+    if speech_worker.thread is None:
+        speech_worker.start()
+    speech_worker.say(text, priority, group)
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
+
+def stream_completion(messages, **kwargs):
+    response = openai.ChatCompletion.create(model="gpt-4", messages=messages, stream=True, **kwargs)
+    for chunk in response:
+        content = chunk.choices[0].delta.get("content")
+        if content:
+            yield content
+
+def iter_sentences(tokens):
+    buffer = ""
+    for token in tokens:
+        buffer += token
+        parts = SENTENCE_BOUNDARY.split(buffer)
+        for sentence in parts[:-1]:
+            if sentence.strip():
+                yield sentence.strip()
+        buffer = parts[-1]
+    if buffer.strip():
+        yield buffer.strip()
+
+def speak_stream(tokens):
+    # Queue each sentence as soon as it is complete while the rest is still being generated
+    spoken = []
+    group = next(speech_worker.sequence)
+    for sentence in iter_sentences(tokens):
+        print(sentence)
+        speech_worker.wait_for_group(group)
+        speak(sentence, group=group)
+        spoken.append(sentence)
+    return " ".join(spoken)
+
+def read_action(tokens):
+    # The action is a single line, so stop reading as soon as it is complete
+    action = ""
+    for token in tokens:
+        action += token
+        if "\n" in action.strip():
+            break
+    return action.strip().split("\n")[0].strip()
+
+class PCMSource:
+    def __init__(self, pcm, sample_rate=16000, sample_width=2, chunk_size=1024):
+        self.pcm = pcm
+        self.SAMPLE_RATE = sample_rate
+        self.SAMPLE_WIDTH = sample_width
+        self.CHUNK = chunk_size
+        self.stream = None
+
+    def __enter__(self):
+        self.stream = PCMSource.Stream(self.pcm, self.SAMPLE_WIDTH)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream = None
+
+    class Stream:
+        def __init__(self, pcm, sample_width):
+            self.buffer = io.BytesIO(pcm)
+            self.sample_width = sample_width
+
+        def read(self, frames):
+            return self.buffer.read(frames * self.sample_width)
+
+class NetworkPCMSource:
+    # Accepts one TCP connection and reads raw PCM from it
+    def __init__(self, host="127.0.0.1", port=5055, sample_rate=16000, sample_width=2, chunk_size=1024):
+        self.host = host
+        self.port = port
+        self.SAMPLE_RATE = sample_rate
+        self.SAMPLE_WIDTH = sample_width
+        self.CHUNK = chunk_size
+        self.connection = None
+        self.stream = None
+
+    def __enter__(self):
+        with socket.create_server((self.host, self.port)) as server:
+            logging.info(f"Waiting for an audio stream on {self.host}:{self.port}")
+            self.connection, address = server.accept()
+        logging.info(f"Audio stream connected from {address[0]}:{address[1]}")
+        self.stream = NetworkPCMSource.Stream(self.connection, self.SAMPLE_WIDTH)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.connection is not None:
+            self.connection.close()
+        self.connection = None
+        self.stream = None
+
+    class Stream:
+        def __init__(self, connection, sample_width):
+            self.connection = connection
+            self.sample_width = sample_width
+
+        def read(self, frames):
+            wanted = frames * self.sample_width
+            data = b""
+            while len(data) < wanted:
+                chunk = self.connection.recv(wanted - len(data))
+                if not chunk:
+                    break
+                data += chunk
+            return data
+
+class CaptureSession:
+    SAMPLE_TYPECODES = {1: "b", 2: "h", 4: "i"}
+
+    def __init__(self, source, frame_ms=30, pause_ms=400, start_ms=90, pre_roll_ms=300,
+                 max_phrase_seconds=15, calibrate_interval=60, energy_ratio=1.5, vad_aggressiveness=None,
+                 calibrate_on_open=None):
+        self.source = source
+        # Live sources start with ambient noise worth measuring; recordings may start with speech,
+        # so they keep the default threshold and adapt from the quiet frames they contain
+        self.calibrate_on_open = not isinstance(source, PCMSource) if calibrate_on_open is None else calibrate_on_open
+        self.frame_ms = frame_ms
+        self.pause_ms = pause_ms
+        self.start_ms = start_ms
+        self.pre_roll_ms = pre_roll_ms
+        self.max_phrase_seconds = max_phrase_seconds
+        self.calibrate_interval = calibrate_interval
+        self.energy_ratio = energy_ratio
+        self.vad = webrtcvad.Vad(vad_aggressiveness) if webrtcvad is not None and vad_aggressiveness is not None else None
+        self.energy_threshold = 300
+        self.ambient_energy = []
+        self.last_calibration = 0
+        self.lock = threading.Lock()
+        self.opened = False
+
+    @classmethod
+    def from_config(cls, capture_config):
+        source_name = capture_config.get("source", "microphone")
+        sample_rate = capture_config.get("sample_rate", 16000)
+        if source_name == "microphone":
+            source = sr.Microphone(device_index=capture_config.get("device_index"), sample_rate=sample_rate)
+        elif source_name == "network":
+            source = NetworkPCMSource(capture_config.get("host", "127.0.0.1"), capture_config.get("port", 5055), sample_rate)
+        else:
+            source = sr.AudioFile(source_name)
+        return cls(source,
+                   pause_ms=capture_config.get("pause_ms", 400),
+                   max_phrase_seconds=capture_config.get("max_phrase_seconds", 15),
+                   calibrate_interval=capture_config.get("calibrate_interval", 60),
+                   vad_aggressiveness=capture_config.get("vad_aggressiveness", 2),
+                   calibrate_on_open=source_name in ("microphone", "network"))
+
+    def open(self):
+        started = time.perf_counter()
+        self.source.__enter__()
+        self.opened = True
+        self.frame_size = max(1, int(self.source.SAMPLE_RATE * self.frame_ms / 1000))
+        if self.vad is not None and (self.source.SAMPLE_RATE not in (8000, 16000, 32000, 48000) or self.source.SAMPLE_WIDTH != 2):
+            logging.warning("Voice activity detector needs 16-bit audio at 8/16/32/48 kHz, using energy threshold instead")
+            self.vad = None
+        if self.calibrate_on_open:
+            self.calibrate()
+        record_startup_phase("open audio source", started)
+        logging.info(f"Capture session opened ({self.source.SAMPLE_RATE} Hz, VAD {'on' if self.vad else 'off'})")
+
+    def close(self):
+        if self.opened:
+            self.source.__exit__(None, None, None)
+            self.opened = False
+
+    def _read_frame(self):
+        frame = self.source.stream.read(self.frame_size)
+        if len(frame) < self.frame_size * self.source.SAMPLE_WIDTH:
+            return frame or None
+        return frame
+
+    def _energy(self, frame):
+        typecode = self.SAMPLE_TYPECODES.get(self.source.SAMPLE_WIDTH)
+        if typecode is None or not frame:
+            return 0
+        samples = array.array(typecode, frame[:len(frame) - len(frame) % self.source.SAMPLE_WIDTH])
+        return math.sqrt(sum(sample * sample for sample in samples) / len(samples)) if samples else 0
+
+    def calibrate(self, duration=0.5):
+        energies = []
+        for _ in range(max(1, int(duration * 1000 / self.frame_ms))):
+            frame = self._read_frame()
+            if frame is None:
+                break
+            energies.append(self._energy(frame))
+        if energies:
+            self.energy_threshold = max(sum(energies) / len(energies) * self.energy_ratio, 50)
+        self.ambient_energy = []
+        self.last_calibration = time.time()
+        logging.debug(f"Energy threshold calibrated to {self.energy_threshold:.0f}")
+
+    def _recalibrate_from_ambient(self):
+        if self.ambient_energy and time.time() - self.last_calibration >= self.calibrate_interval:
+            self.energy_threshold = max(sum(self.ambient_energy) / len(self.ambient_energy) * self.energy_ratio, 50)
+            self.ambient_energy = []
+            self.last_calibration = time.time()
+            logging.debug(f"Energy threshold recalibrated to {self.energy_threshold:.0f}")
+
+    def _is_speech(self, frame, energy):
+        if self.vad is not None and len(frame) == self.frame_size * 2:
+            return self.vad.is_speech(frame, self.source.SAMPLE_RATE) and energy > self.energy_threshold / self.energy_ratio
+        return energy > self.energy_threshold
+
+    def next_phrase(self):
+        with self.lock:
+            if not self.opened:
+                self.open()
+            pre_roll = deque(maxlen=max(1, self.pre_roll_ms // self.frame_ms))
+            start_frames = max(1, self.start_ms // self.frame_ms)
+            pause_frames = max(1, self.pause_ms // self.frame_ms)
+            max_frames = int(self.max_phrase_seconds * 1000 / self.frame_ms)
+            phrase = []
+            speech_run = 0
+            silence_run = 0
+
+            while True:
+                frame = self._read_frame()
+                if frame is None:
+                    if phrase:
+                        break
+                    raise EOFError("Audio source exhausted")
+                energy = self._energy(frame)
+                speaking = self._is_speech(frame, energy)
+
+                if not phrase:
+                    pre_roll.append(frame)
+                    if speaking:
+                        speech_run += 1
+                        if speech_run >= start_frames:
+                            phrase = list(pre_roll)
+                    else:
+                        speech_run = 0
+                        self.ambient_energy.append(energy)
+                        self._recalibrate_from_ambient()
+                    continue
+
+                phrase.append(frame)
+                silence_run = 0 if speaking else silence_run + 1
+                if silence_run >= pause_frames or len(phrase) >= max_frames:
+                    break
+
+            if silence_run:
+                phrase = phrase[:len(phrase) - silence_run + 1]
+            return sr.AudioData(b"".join(phrase), self.source.SAMPLE_RATE, self.source.SAMPLE_WIDTH)
+
+capture_session = None
+
+def get_capture_session():
+    global capture_session
+    # A thread can bring its own audio source (the benchmark feeds each worker a WAV fixture)
+    override = getattr(session_context, "capture", None)
+    if override is not None:
+        return override
+    if capture_session is None:
+        capture_session = CaptureSession.from_config(config.get("capture", {}))
+    return capture_session
+
+def capture_audio():
+    session = get_capture_session()
+    logging.info("Listening for speech input")
+    print("Listening...")
+    return session.next_phrase()
+
+asr_backends = {}
+
+def asr_backend(name):
+    def register(func):
+        asr_backends[name] = func
+        return func
+    return register
+
+def make_recognizer(timeout):
+    # Bound network calls by the time left for this utterance so a hung request frees its thread
     recognizer = sr.Recognizer()
-    mic = sr.Microphone()
+    recognizer.operation_timeout = timeout
+    return recognizer
 
-    with mic as source:
-        logging.info("Listening for speech input")
-        print("Listening...")
-        audio = recognizer.listen(source)
-    
+@asr_backend("google")
+def recognize_with_google(audio, options, timeout=None):
+    return make_recognizer(timeout).recognize_google(audio, **options)
+
+@asr_backend("whisper")
+def recognize_with_whisper(audio, options, timeout=None):
+    return make_recognizer(timeout).recognize_whisper(audio, **options).strip()
+
+@asr_backend("vosk")
+def recognize_with_vosk(audio, options, timeout=None):
+    text = json.loads(make_recognizer(timeout).recognize_vosk(audio, **options)).get("text", "")
+    if not text:
+        raise sr.UnknownValueError()
+    return text
+
+@asr_backend("sphinx")
+def recognize_with_sphinx(audio, options, timeout=None):
+    return make_recognizer(timeout).recognize_sphinx(audio, **options)
+
+@asr_backend("stub")
+def recognize_with_stub(audio, options, timeout=None):
+    if not options.get("text"):
+        raise sr.UnknownValueError()
+    return options["text"]
+
+class ASRRouter:
+    def __init__(self, engine_name="google", fallback=None, hedge_ms=None, timeout_ms=10000, options=None):
+        for name in filter(None, (engine_name, fallback)):
+            if name not in asr_backends:
+                raise ValueError(f"Unknown speech recognition engine: {name}")
+        self.engine_name = engine_name
+        self.fallback = fallback
+        self.hedge_ms = hedge_ms
+        self.timeout_ms = timeout_ms
+        self.options = options or {}
+        # One pool per engine, so a primary stuck on hung requests cannot starve the fallback
+        self.executors = {name: ThreadPoolExecutor(max_workers=4, thread_name_prefix=f"nova-asr-{name}")
+                          for name in filter(None, (engine_name, fallback))}
+        self.stats_lock = threading.Lock()
+        self.backend_stats = {}
+        self.hedges = 0
+
+    def _submit(self, name, audio, deadline):
+        return self.executors[name].submit(self._call, name, audio, deadline)
+
+    def _call(self, name, audio, deadline):
+        started = time.perf_counter()
+        try:
+            timeout = max(0.1, deadline - time.monotonic()) if deadline else None
+            result = asr_backends[name](audio, self.options.get(name, {}), timeout)
+            self._record(name, time.perf_counter() - started, None)
+            return name, result
+        except Exception as e:
+            self._record(name, time.perf_counter() - started, e)
+            raise
+
+    def _record(self, name, elapsed, error):
+        with self.stats_lock:
+            stats = self.backend_stats.setdefault(name, {"calls": 0, "errors": 0, "wins": 0, "latencies": deque(maxlen=200)})
+            stats["calls"] += 1
+            stats["latencies"].append(elapsed)
+            if error is not None:
+                stats["errors"] += 1
+                logging.debug(f"Speech recognition engine {name} failed after {elapsed * 1000:.0f} ms: {error}")
+
+    def recognize(self, audio):
+        started = time.monotonic()
+        deadline = started + self.timeout_ms / 1000 if self.timeout_ms else None
+        futures = [self._submit(self.engine_name, audio, deadline)]
+        try:
+            return self._await(futures, audio, started, deadline)
+        finally:
+            # Calls that never started are abandoned rather than left queued behind slow ones
+            for future in futures:
+                future.cancel()
+
+    def _await(self, futures, audio, started, deadline):
+        pending = set(futures)
+        hedged = not self.fallback
+        last_error = None
+
+        while True:
+            if not hedged and self.hedge_ms is not None:
+                timeout = max(0, started + self.hedge_ms / 1000 - time.monotonic())
+            else:
+                timeout = max(0, deadline - time.monotonic()) if deadline else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    name, result = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                with self.stats_lock:
+                    self.backend_stats[name]["wins"] += 1
+                return result
+
+            hedge_due = self.hedge_ms is not None and time.monotonic() - started >= self.hedge_ms / 1000
+            if not hedged and (not pending or hedge_due):
+                # Primary is slow or failed: race the same audio on the fallback engine
+                hedged = True
+                if pending:
+                    self.hedges += 1
+                    logging.info(f"Speech recognition engine {self.engine_name} is slow, hedging with {self.fallback}")
+                futures.append(self._submit(self.fallback, audio, deadline))
+                pending.add(futures[-1])
+                continue
+            if not pending:
+                raise last_error
+            if deadline and time.monotonic() >= deadline:
+                raise sr.RequestError(f"Speech recognition timed out after {self.timeout_ms} ms")
+
+    def stats(self):
+        with self.stats_lock:
+            report = {"hedges": self.hedges}
+            for name, stats in self.backend_stats.items():
+                latencies = sorted(stats["latencies"])
+                report[name] = {
+                    "calls": stats["calls"],
+                    "errors": stats["errors"],
+                    "wins": stats["wins"],
+                    "latency_p50": latencies[len(latencies) // 2] if latencies else 0.0,
+                    "latency_p95": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+                }
+            return report
+
+asr_config = config.get("asr", {})
+asr_router = ASRRouter(engine_name=asr_config.get("engine", "google"),
+                       fallback=asr_config.get("fallback"),
+                       hedge_ms=asr_config.get("hedge_ms"),
+                       timeout_ms=asr_config.get("timeout_ms", 10000),
+                       options=asr_config.get("options"))
+
+def transcribe_audio(audio):
     try:
-        command = recognizer.recognize_google(audio)
+        with metrics.span("recognize"):
+            command = asr_router.recognize(audio)
         logging.info(f"Recognized speech: {command}")
+        publish_event("recognized", text=command, source="speech")
         print(f"You said: {command}")
         return command
     except sr.UnknownValueError:
@@ -91,27 +1570,67 @@ def recognize_speech():
         speak("I didn't catch that. Could you please repeat?")
         return None
     except sr.RequestError as e:
-        logging.error(f"Google Speech Recognition service error: {e}")
-        print(f"Could not request results from Google Speech Recognition service: {e}.")
-        speak("There was an error with the Google Speech Recognition service.")
+        logging.error(f"Speech recognition service error: {e}")
+        print(f"Could not request results from the speech recognition service: {e}.")
+        speak("There was an error with the speech recognition service.")
         return None
     except Exception as e:
         logging.error(f"Unexpected error in recognize_speech: {e}")
         speak("An unexpected error occurred.")
         return None
 
+def recognize_speech():
+    # While a listener owns the audio source, take the next utterance from it instead
+    listener = getattr(session_context, "session", None) or pipeline
+    if listener is not None and listener.is_running():
+        return listener.await_transcript()
+    begin_command()
+    with metrics.span("capture"):
+        audio = capture_audio()
+    return transcribe_audio(audio)
+
 def parse_command(user_id, command):
+    started = time.perf_counter()
+    with metrics.span("parse"):
+        action = _parse_command(user_id, command)
+    command_history.note_parse(current_command_id(), user_id, command, action,
+                               round((time.perf_counter() - started) * 1000, 2))
+    publish_event("parsed", user_id=user_id, text=command, action=action)
+    return action
+
+def _parse_command(user_id, command):
+    if config.get("intent_matcher", {}).get("enabled", True):
+        action = intent_index.match(command)
+        if action:
+            logging.info(f"Matched command locally: {action}")
+            context_manager.add_turn(user_id, command, action)
+            return action
+
     try:
         context = context_manager.get_context(user_id)
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a voice assistant. Respond with the specific action text only."},
-                {"role": "user", "content": f"Command: {command}\nContext: {context}"}
-            ]
-        )
-        action = response.choices[0].message['content'].strip()
+        cache_enabled = response_cache_config.get("enabled", True)
+        if cache_enabled:
+            cache_key = ResponseCache.make_key(command, context)
+            action = response_cache.get(cache_key)
+            if action:
+                logging.info(f"Parsed command from cache: {action}")
+                context_manager.add_turn(user_id, command, action)
+                return action
+
+        messages = [
+            {"role": "system", "content": "You are a voice assistant. Respond with the specific action text only."},
+            {"role": "user", "content": f"Command: {command}\nContext: {context_manager.render_context(user_id)}"}
+        ]
+        if config.get("streaming", False):
+            action = read_action(stream_completion(messages))
+        else:
+            response = openai.ChatCompletion.create(model="gpt-4", messages=messages)
+            action = response.choices[0].message['content'].strip()
         logging.info(f"Parsed command: {action}")
+        if action:
+            context_manager.add_turn(user_id, command, action)
+            if cache_enabled:
+                response_cache.put(cache_key, action)
         return action
     except Exception as e:
         logging.error(f"Error parsing command: {e}")
@@ -119,29 +1638,278 @@ def parse_command(user_id, command):
         speak("Error parsing command.")
         return None
 
-def execute_action(user_id, action):
-    if action.startswith("open "):
-        program = action.replace("open ", "").strip()
-        open_program(program)
-    elif action.startswith("close "):
-        program = action.replace("close ", "").strip()
-        close_program(program)
-    elif "current time" in action:
-        speak_current_time()
-    elif "search " in action:
-        query = action.replace("search ", "").strip()
-        search_in_brave(query)
-    elif "start personal log" in action:
-        start_personal_log(user_id)
-    elif "set reminder" in action:
-        reminder_details = action.replace("set reminder ", "").strip()
-        set_reminder(reminder_details)
-    elif "stop listening" in action:
-        speak("Goodbye!")
-        exit()
-    else:
+class CommandRegistry:
+    def __init__(self):
+        self.handlers = {}
+        self.max_verb_words = 1
+        self.custom_commands = {}
+        self.custom_source = {}
+        self.lock = threading.RLock()
+        self.command_stats = {}
+
+    def register(self, verb, handler, name=None, takes_argument=True):
+        verb = normalize_command(verb)
+        with self.lock:
+            self.handlers[verb] = {"name": name or verb, "handler": handler, "takes_argument": takes_argument}
+            self.max_verb_words = max(self.max_verb_words, len(verb.split()))
+
+    def unregister(self, verb):
+        with self.lock:
+            self.handlers.pop(normalize_command(verb), None)
+            self.max_verb_words = max([len(v.split()) for v in self.handlers] or [1])
+
+    def command(self, *verbs, takes_argument=True):
+        def decorator(handler):
+            for verb in verbs:
+                self.register(verb, handler, name=handler.__name__, takes_argument=takes_argument)
+            return handler
+        return decorator
+
+    def verbs(self):
+        with self.lock:
+            return {verb: entry["takes_argument"] for verb, entry in self.handlers.items()}
+
+    def sync_custom_commands(self, custom_commands):
+        # Apply only the entries that changed since the last sync
+        with self.lock:
+            if custom_commands == self.custom_source:
+                return
+            for command in set(self.custom_source) - set(custom_commands):
+                self.custom_commands.pop(normalize_command(command), None)
+            for command, action in custom_commands.items():
+                if self.custom_source.get(command) != action:
+                    self.custom_commands[normalize_command(command)] = action
+            self.custom_source = dict(custom_commands)
+            logging.debug(f"Custom commands synced: {len(self.custom_commands)} loaded")
+
+    def resolve(self, action):
+        self.sync_custom_commands(config.get("custom_commands", {}))
+        tokens = action.strip().split()
+        lowered = [token.lower() for token in tokens]
+        with self.lock:
+            custom_action = self.custom_commands.get(normalize_command(action))
+            if custom_action is not None:
+                return "custom", custom_action, None
+            # Longest verb first, so "set reminder" is never mistaken for a shorter verb
+            for length in range(min(self.max_verb_words, len(tokens)), 0, -1):
+                entry = self.handlers.get(" ".join(lowered[:length]))
+                if entry is not None:
+                    return entry["name"], entry, " ".join(tokens[length:])
+            # Fall back to a verb anywhere in the text, e.g. "what's the current time". Verbs that take an
+            # argument must lead the reply, or "I can't close notepad" would close it
+            padded = f" {normalize_command(action)} "
+            for verb in sorted(self.handlers, key=len, reverse=True):
+                if self.handlers[verb]["takes_argument"]:
+                    continue
+                if f" {verb} " in padded:
+                    return self.handlers[verb]["name"], self.handlers[verb], ""
+        return None
+
+    def dispatch(self, user_id, action, depth=0, dry_run=False):
+        # With dry_run the handler is looked up but not called, and a description of the call is returned
+        resolved = self.resolve(action)
+        if resolved is None:
+            return False
+        name, entry, argument = resolved
+        if name == "custom":
+            if depth > 2:
+                logging.warning(f"Custom command loop detected for: {action}")
+                return False
+            return self.dispatch(user_id, entry, depth + 1, dry_run)
+        if dry_run:
+            return {"handler": name, "argument": argument, "resolved_action": action}
+
+        command_trace.handler = name
+        started = time.perf_counter()
+        failed = True
+        try:
+            entry["handler"](user_id, argument)
+            failed = False
+        finally:
+            self._record(name, time.perf_counter() - started, failed)
+        return True
+
+    def _record(self, name, elapsed, failed):
+        with self.lock:
+            stats = self.command_stats.setdefault(name, {"calls": 0, "errors": 0, "total_time": 0.0, "max_time": 0.0})
+            stats["calls"] += 1
+            stats["errors"] += int(failed)
+            stats["total_time"] += elapsed
+            stats["max_time"] = max(stats["max_time"], elapsed)
+
+    def stats(self):
+        with self.lock:
+            return {name: dict(stats, avg_time=stats["total_time"] / stats["calls"])
+                    for name, stats in self.command_stats.items()}
+
+command_registry = CommandRegistry()
+
+def execute_action(user_id, action, dry_run=False):
+    if dry_run:
+        return command_registry.dispatch(user_id, action, dry_run=True) or None
+    command_trace.handler = None
+    started = time.perf_counter()
+    error = None
+    try:
+        with metrics.span("execute"):
+            handled = command_registry.dispatch(user_id, action)
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        handler = command_trace.handler
+        command_history.note_execute(current_command_id(), handler,
+                                     error or (None if handler else "command not recognized"),
+                                     round((time.perf_counter() - started) * 1000, 2))
+    publish_event("executed", user_id=user_id, action=action, handled=handled)
+    if not handled:
         speak("Command not recognized. Please try again.")
 
+class ProcessManager:
+    def __init__(self):
+        self.processes = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _launch_command(executable, args):
+        if sys.platform == "darwin":
+            return ["open", "-a", executable] + (["--args"] + list(args) if args else [])
+        return [executable] + list(args)
+
+    def launch(self, program, executable, args=()):
+        kwargs = {"stdin": subprocess.DEVNULL, "stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+        if os.name == 'nt':
+            kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs["start_new_session"] = True
+        process = subprocess.Popen(self._launch_command(executable, args), **kwargs)
+        with self.lock:
+            handles = [p for p in self.processes.get(program, []) if p.poll() is None]
+            handles.append(process)
+            self.processes[program] = handles
+        return process
+
+    def _process_table(self):
+        # Maps lowercase process names and executable paths to pids
+        table = {}
+        try:
+            if psutil is not None:
+                for process in psutil.process_iter(["name", "exe"]):
+                    for key in (process.info["name"], process.info["exe"]):
+                        if key:
+                            table.setdefault(key.lower(), []).append(process.pid)
+            elif os.name == 'nt':
+                output = subprocess.run(["tasklist", "/fo", "csv", "/nh"], capture_output=True, text=True).stdout
+                for line in output.splitlines():
+                    fields = line.strip('"').split('","')
+                    if len(fields) > 1 and fields[1].isdigit():
+                        table.setdefault(fields[0].lower(), []).append(int(fields[1]))
+            else:
+                output = subprocess.run(["ps", "-eo", "pid=,comm="], capture_output=True, text=True).stdout
+                for line in output.splitlines():
+                    pid, _, name = line.strip().partition(" ")
+                    if pid.isdigit() and name:
+                        table.setdefault(name.strip().lower(), []).append(int(pid))
+                        table.setdefault(os.path.basename(name.strip()).lower(), []).append(int(pid))
+        except Exception as e:
+            logging.error(f"Could not read the process table: {e}")
+        return table
+
+    @staticmethod
+    def _table_pids(table, executable):
+        pids = set(table.get(executable.lower(), []))
+        pids.update(table.get(os.path.basename(executable).lower(), []))
+        return pids
+
+    def close(self, program, executable, timeout=3):
+        closed = 0
+        with self.lock:
+            handles = self.processes.pop(program, [])
+        for process in handles:
+            if process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                closed += 1
+
+        # Also close instances that were not launched by us
+        pids = self._table_pids(self._process_table(), executable) - {os.getpid()}
+        for pid in pids:
+            try:
+                if psutil is not None:
+                    psutil.Process(pid).terminate()
+                elif os.name == 'nt':
+                    subprocess.run(["taskkill", "/f", "/pid", str(pid)], capture_output=True)
+                else:
+                    os.kill(pid, 15)
+                closed += 1
+            except Exception as e:
+                logging.debug(f"Could not terminate process {pid}: {e}")
+        return closed
+
+    def running(self, program_mapping):
+        table = self._process_table()
+        running = {}
+        with self.lock:
+            for program, executable in program_mapping.items():
+                tracked = any(p.poll() is None for p in self.processes.get(program, []))
+                running[program] = tracked or bool(self._table_pids(table, executable))
+        return running
+
+process_manager = ProcessManager()
+
+WINDOW_TITLES = {
+    "notepad": "Notepad",
+    "visual studio code": "Visual Studio Code",
+    "brave browser": "Brave",
+}
+
+def find_window(title=None, pid=None):
+    if os.name == 'nt':
+        windows = pyautogui.getWindowsWithTitle(title) if title else []
+        return windows[0] if windows else None
+    if shutil.which("xdotool"):
+        criteria = ["--pid", str(pid)] if pid else ["--name", title] if title else None
+        if criteria is None:
+            return None
+        output = subprocess.run(["xdotool", "search", "--onlyvisible"] + criteria, capture_output=True, text=True).stdout
+        window_ids = output.split()
+        return window_ids[0] if window_ids else None
+    return None
+
+def wait_until_ready(process, title=None, timeout=10, poll_interval=0.1, settle=0.5):
+    # Poll for the program's window (or, where windows cannot be inspected, its process state) until the deadline
+    started = time.monotonic()
+    can_inspect_windows = os.name == 'nt' or shutil.which("xdotool") is not None
+    while time.monotonic() - started < timeout:
+        if process is not None and process.poll() not in (None, 0):
+            logging.warning(f"Process exited with code {process.returncode} before becoming ready")
+            return None
+        if can_inspect_windows:
+            window = find_window(title=title) if title else None
+            if window is None and process is not None and process.poll() is None and os.name != 'nt':
+                window = find_window(pid=process.pid)
+            if window is not None:
+                return window
+        elif time.monotonic() - started >= settle:
+            return True
+        time.sleep(poll_interval)
+    return None
+
+def focus_window(window):
+    if not window or window is True:
+        return
+    try:
+        if os.name == 'nt':
+            window.activate()
+            window.maximize()
+        elif shutil.which("xdotool"):
+            subprocess.run(["xdotool", "windowactivate", "--sync", str(window)], capture_output=True, timeout=5)
+    except Exception as e:
+        logging.debug(f"Could not focus window: {e}")
+
 def open_program(program):
     program_mapping = config["program_mapping"]
 
@@ -154,15 +1922,7 @@ def open_program(program):
             return
         
         try:
-            if os.name == 'nt':  # For Windows
-                subprocess.run([executable], shell=True)
-            elif os.name == 'posix':  # For MacOS/Linux
-                subprocess.run(["open", "-a", executable])
-            else:
-                logging.error("Unsupported operating system")
-                print("Unsupported OS")
-                speak("Unsupported operating system")
-                return
+            process_manager.launch(program, executable)
             logging.info(f"Opening {program}")
             print(f"Opening {program}")
             speak(f"Opening {program}")
@@ -186,49 +1946,110 @@ def close_program(program):
         return
     
     try:
-        if os.name == 'nt':  # For Windows
-            subprocess.run(["taskkill", "/f", "/im", executable], shell=True)
-        else:
-            logging.error(f"Closing {program} is only supported on Windows")
-            print(f"Closing {program} is only supported on Windows")
-            speak(f"Closing {program} is only supported on Windows")
+        closed = process_manager.close(program, executable)
+        logging.info(f"Closed {closed} process(es) for {program}")
+        print(f"Closed {closed} process(es) for {program}")
     except Exception as e:
         logging.error(f"Could not close {program}: {e}")
         print(f"Could not close {program}: {e}")
         speak(f"Could not close {program}")
 
+def running_programs():
+    running = [program for program, is_running in process_manager.running(config["program_mapping"]).items() if is_running]
+    logging.info(f"Running programs: {running}")
+    print(f"Running programs: {running}")
+    if running:
+        speak(f"Currently running: {', '.join(running)}")
+    else:
+        speak("None of your programs are running.")
+
+def split_text_chunks(text, chunk_size):
+    # Prefer to break at line ends so each paste leaves the editor at the start of a line
+    chunks = []
+    while len(text) > chunk_size:
+        cut = text.rfind("\n", 0, chunk_size) + 1 or chunk_size
+        chunks.append(text[:cut])
+        text = text[cut:]
+    if text:
+        chunks.append(text)
+    return chunks
+
+def insert_text(text):
+    injection_config = config.get("text_injection", {})
+    if pyperclip is not None and injection_config.get("mode", "clipboard") == "clipboard":
+        paste_keys = ("command", "v") if sys.platform == "darwin" else ("ctrl", "v")
+        chunks = split_text_chunks(text, injection_config.get("chunk_size", 4000))
+        pasted = 0
+        try:
+            previous_clipboard = pyperclip.paste()
+        except Exception:
+            previous_clipboard = None
+        try:
+            for chunk in chunks:
+                pyperclip.copy(chunk)
+                pyautogui.hotkey(*paste_keys)
+                pasted += 1
+            return
+        except Exception as e:
+            logging.warning(f"Clipboard paste failed after {pasted} of {len(chunks)} chunks, typing the rest: {e}")
+        finally:
+            if previous_clipboard is not None:
+                # Give the editor time to read the last chunk before the user's clipboard comes back
+                time.sleep(injection_config.get("restore_delay", 0.2))
+                try:
+                    pyperclip.copy(previous_clipboard)
+                except Exception as e:
+                    logging.warning(f"Could not restore the clipboard: {e}")
+        text = "".join(chunks[pasted:])
+    pyautogui.typewrite(text, interval=0)
+
+def open_editor(program):
+    close_program(program)
+    executable = config["program_mapping"].get(program, "notepad.exe")
+    process = process_manager.launch(program, executable)
+    window = wait_until_ready(process, WINDOW_TITLES.get(program), timeout=20)
+    if not window:
+        logging.warning(f"{program} did not become ready in time")
+    focus_window(window)
+    return window
+
 def generate_code_description(prompt, platform):
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an advanced programming bot. Provide detailed code for the given prompt."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=150
-        )
-        description = response.choices[0].message['content'].strip()
+        program = platform.lower()
+        editor = None
+        if program in ("notepad", "visual studio code"):
+            # Bring the editor up while the code is being generated
+            editor = threading.Thread(target=open_editor, args=(program,), name="nova-editor", daemon=True)
+            editor.start()
+
+        messages = [
+            {"role": "system", "content": "You are an advanced programming bot. Provide detailed code for the given prompt."},
+            {"role": "user", "content": prompt}
+        ]
+        if config.get("streaming", False):
+            chunks = []
+            pending = ""
+            for token in stream_completion(messages, max_tokens=150):
+                print(token, end="", flush=True)
+                chunks.append(token)
+                pending += token
+                # Paste whole lines into the editor as soon as it is ready
+                if editor is not None and not editor.is_alive() and "\n" in pending:
+                    lines, _, pending = pending.rpartition("\n")
+                    insert_text(lines + "\n")
+            print()
+            description = "".join(chunks).strip()
+        else:
+            response = openai.ChatCompletion.create(model="gpt-4", messages=messages, max_tokens=150)
+            description = pending = response.choices[0].message['content'].strip()
+            print(description)
         logging.info(f"Generated code description: {description}")
-        print(description)
 
-        if platform.lower() == "notepad":
-            close_program("notepad")
-            time.sleep(1)
-            subprocess.run(["notepad.exe"])
-            time.sleep(2)
-            pyautogui.typewrite(description, interval=0)
-        
-        elif platform.lower() == "visual studio code":
-            close_program("visual studio code")
-            time.sleep(1)
-            subprocess.run([config["program_mapping"]["visual studio code"]])
-            time.sleep(5)
-            pyautogui.hotkey('win', 'down')
-            time.sleep(1)
-            pyautogui.hotkey('win', 'up')
-            time.sleep(1)
-            pyautogui.typewrite(description, interval=0)
-        
+        if editor is not None:
+            editor.join()
+            if pending:
+                insert_text(pending)
+
         speak("Here is the code you requested.")
     except Exception as e:
         logging.error(f"Error generating code description: {e}")
@@ -238,11 +2059,10 @@ def generate_code_description(prompt, platform):
 def search_in_brave(query):
     brave_path = config["program_mapping"]["brave browser"]
     try:
+        # Open the results page directly instead of typing into the browser
+        url = config.get("search_url", "https://search.brave.com/search?q={query}").format(query=quote_plus(query))
         logging.info(f"Opening Brave browser for search: {query}")
-        subprocess.run([brave_path], shell=True)
-        time.sleep(5)
-        pyautogui.typewrite(query)
-        pyautogui.press('enter')
+        process_manager.launch("brave browser", brave_path, [url])
         logging.info(f"Searching for {query} in Brave browser")
         speak(f"Searching for {query} in Brave browser.")
     except Exception as e:
@@ -256,38 +2076,155 @@ def speak_current_time():
     print(f"Current time is {current_time}")
     speak(f"The current time is {current_time}")
 
-def save_log_to_file(log_entry):
+class PersonalLogStore:
+    # Append-only personal logs with a full-text index. Each user's entries carry a partition key
+    # that is part of every search, so one user's query never scans another user's logs.
+    STOPWORDS = {"a", "an", "the", "my", "me", "i", "about", "of", "on", "for", "to", "and", "or", "in", "at", "log", "logs"}
+
+    def __init__(self, path="instance/personal_logs.db"):
+        self.path = path
+        self.db = None
+        self.fts = False
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        if self.db is not None:
+            return self.db
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript("""
+            CREATE TABLE IF NOT EXISTS log_entries (id INTEGER PRIMARY KEY, user_id TEXT NOT NULL, partition_key TEXT NOT NULL,
+                                                    created_at REAL NOT NULL, source TEXT, content TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS ix_log_entries_user_created ON log_entries (partition_key, created_at);
+            CREATE TRIGGER IF NOT EXISTS log_entries_no_update BEFORE UPDATE ON log_entries
+                BEGIN SELECT RAISE(ABORT, 'personal logs are append-only'); END;
+            CREATE TRIGGER IF NOT EXISTS log_entries_no_delete BEFORE DELETE ON log_entries
+                BEGIN SELECT RAISE(ABORT, 'personal logs are append-only'); END;
+        """)
+        try:
+            db.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS log_search USING fts5(partition_key, content, content='log_entries',
+                                                                         content_rowid='id', tokenize='porter unicode61');
+                CREATE TRIGGER IF NOT EXISTS log_entries_index AFTER INSERT ON log_entries
+                    BEGIN INSERT INTO log_search (rowid, partition_key, content) VALUES (new.id, new.partition_key, new.content); END;
+            """)
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            logging.warning(f"SQLite has no FTS5 support, personal log search will scan entries: {e}")
+        db.commit()
+        self.db = db
+        return db
+
+    @staticmethod
+    def partition_key(user_id):
+        return "u" + hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:16]
+
+    def append(self, user_id, content, created_at=None, source="voice"):
+        with self.lock:
+            db = self._connect()
+            with db:
+                cursor = db.execute("INSERT INTO log_entries (user_id, partition_key, created_at, source, content) VALUES (?, ?, ?, ?, ?)",
+                                    (user_id, self.partition_key(user_id), created_at or time.time(), source, content))
+            return cursor.lastrowid
+
+    def search_terms(self, query):
+        return [term for term in re.findall(r"\w+", query.lower()) if term not in self.STOPWORDS]
+
+    def search(self, user_id, query, limit=5):
+        terms = self.search_terms(query)
+        if not terms:
+            return []
+        with self.lock:
+            db = self._connect()
+            if not self.fts:
+                conditions = " AND ".join("content LIKE ?" for _ in terms)
+                rows = db.execute(f"SELECT id, created_at, content FROM log_entries WHERE partition_key = ? AND {conditions} "
+                                  "ORDER BY created_at DESC LIMIT ?",
+                                  [self.partition_key(user_id)] + [f"%{term}%" for term in terms] + [limit]).fetchall()
+                return [{"id": row[0], "created_at": row[1], "content": row[2]} for row in rows]
+            # Every term must match first; if nothing does, settle for any term, best matches first
+            for operator in (" AND ", " OR "):
+                match = f'partition_key : "{self.partition_key(user_id)}" AND content : ({operator.join(f"{term}*" for term in terms)})'
+                rows = db.execute("SELECT log_entries.id, log_entries.created_at, log_entries.content FROM log_search "
+                                  "JOIN log_entries ON log_entries.id = log_search.rowid "
+                                  "WHERE log_search MATCH ? ORDER BY rank LIMIT ?", (match, limit)).fetchall()
+                if rows:
+                    return [{"id": row[0], "created_at": row[1], "content": row[2]} for row in rows]
+        return []
+
+    def import_files(self, user_id, directory=".", remove=False):
+        # One-time import of the old personal_log_<timestamp>.txt files; files already imported are skipped
+        with self.lock:
+            db = self._connect()
+            imported = {row[0] for row in db.execute("SELECT source FROM log_entries WHERE source LIKE 'import:%'")}
+        count = 0
+        for filename in sorted(os.listdir(directory)):
+            match = re.fullmatch(r"personal_log_(\d{8}_\d{6})\.txt", filename)
+            if not match:
+                continue
+            path = os.path.join(directory, filename)
+            if f"import:{filename}" not in imported:
+                with open(path, encoding="utf-8", errors="replace") as log_file:
+                    content = log_file.read().strip()
+                if content:
+                    created_at = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").timestamp()
+                    self.append(user_id, content, created_at=created_at, source=f"import:{filename}")
+                    count += 1
+            if remove:
+                os.remove(path)
+        logging.info(f"Imported {count} personal log files from {directory}")
+        return count
+
+personal_log_config = config.get("personal_log", {})
+personal_logs = PersonalLogStore(path=personal_log_config.get("path", os.path.join("instance", "personal_logs.db")))
+
+def save_personal_log(user_id, log_entry):
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"personal_log_{timestamp}.txt"
-        with open(filename, "w") as file:
-            file.write(log_entry)
-        logging.info(f"Personal log saved as {filename}")
-        print(f"Personal log saved as {filename}")
-        speak(f"Personal log saved as {filename}")
+        personal_logs.append(user_id, log_entry)
+        logging.info(f"Personal log saved for {user_id}")
+        print("Personal log saved")
     except Exception as e:
         logging.error(f"Could not save personal log: {e}")
         print(f"Could not save personal log: {e}")
         speak(f"Could not save personal log")
 
+def find_personal_log(user_id, query):
+    try:
+        results = personal_logs.search(user_id, query)
+        logging.info(f"Personal log search for '{query}' found {len(results)} entries")
+        if not results:
+            speak(f"I couldn't find a log about {query}.")
+            return
+        best = results[0]
+        when = datetime.fromtimestamp(best["created_at"]).strftime("%B %d, %Y")
+        print(f"{when}: {best['content']}")
+        more = f" I found {len(results)} matching logs; this is the best match." if len(results) > 1 else ""
+        speak(f"On {when} you logged:{more} {best['content']}")
+    except Exception as e:
+        logging.error(f"Could not search personal logs: {e}")
+        print(f"Could not search personal logs: {e}")
+        speak("Could not search your personal logs")
+
 def start_personal_log(user_id):
     try:
-        speak("Please dictate your personal log.")
+        speak("Please dictate your personal log.", PRIORITY_HIGH)
         personal_log = recognize_speech()
 
         if personal_log:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "Rewrite the following as a personal log entry similar to Star Trek logs:"},
-                    {"role": "user", "content": personal_log}
-                ],
-                max_tokens=150
-            )
-            rewritten_log = response.choices[0].message['content'].strip()
+            messages = [
+                {"role": "system", "content": "Rewrite the following as a personal log entry similar to Star Trek logs:"},
+                {"role": "user", "content": personal_log}
+            ]
+            if config.get("streaming", False):
+                # Read the entry back sentence by sentence while it is being written
+                rewritten_log = speak_stream(stream_completion(messages, max_tokens=150))
+            else:
+                response = openai.ChatCompletion.create(model="gpt-4", messages=messages, max_tokens=150)
+                rewritten_log = response.choices[0].message['content'].strip()
+                print(rewritten_log)
             logging.info(f"Rewritten personal log: {rewritten_log}")
-            print(rewritten_log)
-            save_log_to_file(rewritten_log)
+            save_personal_log(user_id, rewritten_log)
             context_manager.update_context(user_id, {"last_log": rewritten_log})
         
         speak("Personal log entry created.")
@@ -296,6 +2233,112 @@ def start_personal_log(user_id):
         print(f"Could not start personal log: {e}")
         speak(f"Could not start personal log")
 
+class ReminderOutbox:
+    def __init__(self, path="cache/calendar_outbox.db", batch_size=50, max_attempts=8, base_delay=2, max_delay=300):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, event TEXT NOT NULL, "
+                        "attempts INTEGER NOT NULL DEFAULT 0, next_attempt REAL NOT NULL, created_at REAL NOT NULL)")
+        self.db.commit()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="nova-calendar", daemon=True)
+        self.thread.start()
+
+    def add(self, event):
+        now = time.time()
+        with self.lock:
+            self.db.execute("INSERT INTO outbox (event, next_attempt, created_at) VALUES (?, ?, ?)",
+                            (json.dumps(event), now, now))
+            self.db.commit()
+        if self.thread is None:
+            self.start()
+        self.wakeup.set()
+
+    def pending(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def _due(self):
+        with self.lock:
+            return self.db.execute("SELECT id, event, attempts FROM outbox WHERE next_attempt <= ? ORDER BY id LIMIT ?",
+                                   (time.time(), self.batch_size)).fetchall()
+
+    def _next_due_in(self):
+        with self.lock:
+            row = self.db.execute("SELECT MIN(next_attempt) FROM outbox").fetchone()
+        return None if row[0] is None else max(0, row[0] - time.time())
+
+    @staticmethod
+    def _is_permanent(exception):
+        status = getattr(getattr(exception, "resp", None), "status", None)
+        return status is not None and 400 <= int(status) < 500 and int(status) not in (408, 429)
+
+    def _finish(self, row_id, attempts, error):
+        with self.lock:
+            if error is None:
+                self.db.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+            elif attempts + 1 >= self.max_attempts or self._is_permanent(error):
+                logging.error(f"Giving up on reminder {row_id} after {attempts + 1} attempts: {error}")
+                self.db.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+                speak("Could not set the reminder.", PRIORITY_LOW)
+            else:
+                delay = min(self.max_delay, self.base_delay * 2 ** attempts) * random.uniform(0.8, 1.2)
+                logging.warning(f"Reminder {row_id} failed, retrying in {delay:.1f} s: {error}")
+                self.db.execute("UPDATE outbox SET attempts = ?, next_attempt = ? WHERE id = ?",
+                                (attempts + 1, time.time() + delay, row_id))
+            self.db.commit()
+
+    def flush_once(self):
+        rows = self._due()
+        if not rows:
+            return 0
+        try:
+            service = get_calendar_service()
+            results = {}
+
+            def callback(request_id, response, exception):
+                results[request_id] = exception
+
+            api_endpoint = config.get("calendar", {}).get("api_endpoint")
+            if api_endpoint:
+                batch = googleapiclient_http.BatchHttpRequest(callback=callback, batch_uri=f"{api_endpoint.rstrip('/')}/batch/calendar/v3")
+            else:
+                batch = service.new_batch_http_request(callback=callback)
+            for row_id, event, _ in rows:
+                batch.add(service.events().insert(calendarId='primary', body=json.loads(event)), request_id=str(row_id))
+            batch.execute()
+        except Exception as e:
+            results = {str(row_id): e for row_id, _, _ in rows}
+        for row_id, event, attempts in rows:
+            error = results.get(str(row_id))
+            self._finish(row_id, attempts, error)
+            if error is None:
+                logging.info(f"Reminder set: {json.loads(event)['summary']}")
+        return len(rows)
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self._next_due_in())
+            self.wakeup.clear()
+            try:
+                while self.flush_once() == self.batch_size:
+                    pass
+            except Exception as e:
+                logging.error(f"Error flushing reminder outbox: {e}")
+
+calendar_config = config.get("calendar", {})
+reminder_outbox = ReminderOutbox(path=calendar_config.get("outbox_path", "cache/calendar_outbox.db"),
+                                 batch_size=calendar_config.get("batch_size", 50),
+                                 max_attempts=calendar_config.get("max_attempts", 8))
+
 def set_reminder(event_details):
     event = {
         'summary': event_details,
@@ -310,43 +2353,851 @@ def set_reminder(event_details):
     }
 
     try:
-        event = calendar_service.events().insert(calendarId='primary', body=event).execute()
-        logging.info(f"Reminder set: {event_details}")
+        reminder_outbox.add(event)
+        logging.info(f"Reminder queued: {event_details}")
         speak("Reminder has been set.")
     except Exception as e:
         logging.error(f"Error setting reminder: {e}")
         speak("Could not set the reminder.")
 
+def stop_listening(user_id, argument):
+    speak("Goodbye!", PRIORITY_HIGH)
+    exit()
+
+def register_builtin_commands(registry):
+    registry.register("open", lambda user_id, program: open_program(program), name="open_program")
+    registry.register("close", lambda user_id, program: close_program(program), name="close_program")
+    registry.register("running programs", lambda user_id, _: running_programs(), name="running_programs", takes_argument=False)
+    registry.register("current time", lambda user_id, _: speak_current_time(), name="speak_current_time", takes_argument=False)
+    registry.register("search", lambda user_id, query: search_in_brave(query), name="search_in_brave")
+    registry.register("start personal log", lambda user_id, _: start_personal_log(user_id), name="start_personal_log", takes_argument=False)
+    registry.register("set reminder", lambda user_id, details: set_reminder(details), name="set_reminder")
+    registry.register("find log", find_personal_log, name="find_personal_log")
+    registry.register("stop listening", stop_listening, name="stop_listening", takes_argument=False)
+
+def load_command_plugins(registry):
+    # A plugin is a module with a register(registry) function
+    for module_name in config.get("command_plugins", []):
+        try:
+            importlib.import_module(module_name).register(registry)
+            logging.info(f"Loaded command plugin {module_name}")
+        except Exception as e:
+            logging.error(f"Could not load command plugin {module_name}: {e}")
+
+register_builtin_commands(command_registry)
+load_command_plugins(command_registry)
+
+class TranscriptWaiters:
+    # Lets a running command (e.g. a personal log) take the next utterance instead of the parser
+    def __init__(self):
+        self.waiters = []
+        self.lock = threading.Lock()
+
+    def wait(self, timeout=60):
+        waiter = queue.Queue(maxsize=1)
+        with self.lock:
+            self.waiters.append((time.time(), waiter))
+        try:
+            return waiter.get(timeout=timeout)
+        except queue.Empty:
+            with self.lock:
+                self.waiters = [w for w in self.waiters if w[1] is not waiter]
+            return None
+
+    def deliver(self, captured_at, command):
+        with self.lock:
+            for i, (since, waiter) in enumerate(self.waiters):
+                if since <= captured_at:
+                    self.waiters.pop(i)[1].put(command)
+                    return True
+        return False
+
+class CommandPipeline:
+    DROP_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+    def __init__(self, user_id, queue_size=4, drop_policy="drop_oldest"):
+        if drop_policy not in self.DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.user_id = user_id
+        self.drop_policy = drop_policy
+        self.audio_queue = queue.Queue(maxsize=queue_size)
+        self.command_queue = queue.Queue(maxsize=queue_size)
+        self.action_queue = queue.Queue(maxsize=queue_size)
+        self.dropped = {"audio": 0, "command": 0, "action": 0}
+        self.stop_event = threading.Event()
+        self.transcripts = TranscriptWaiters()
+        self.workers = []
+
+    def start(self):
+        stages = [("capture", self._capture_loop), ("recognize", self._recognize_loop),
+                  ("parse", self._parse_loop), ("execute", self._execute_loop)]
+        for name, target in stages:
+            worker = threading.Thread(target=target, name=f"nova-{name}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+        logging.info(f"Command pipeline started (queue size {self.audio_queue.maxsize}, policy {self.drop_policy})")
+
+    def stop(self):
+        self.stop_event.set()
+
+    def is_running(self):
+        return bool(self.workers) and not self.stop_event.is_set()
+
+    def await_transcript(self, timeout=60):
+        return self.transcripts.wait(timeout)
+
+    def _offer(self, stage, target_queue, item):
+        if self.drop_policy == "block":
+            while not self.stop_event.is_set():
+                try:
+                    target_queue.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        while True:
+            try:
+                target_queue.put_nowait(item)
+                return True
+            except queue.Full:
+                self.dropped[stage] += 1
+                if self.drop_policy == "drop_newest":
+                    logging.warning(f"Pipeline {stage} queue full, dropping newest item")
+                    return False
+                try:
+                    target_queue.get_nowait()
+                    logging.warning(f"Pipeline {stage} queue full, dropped oldest item")
+                except queue.Empty:
+                    pass
+
+    def _take(self, source_queue):
+        while not self.stop_event.is_set():
+            try:
+                return source_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return None
+
+    def _capture_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                command_id = begin_command()
+                with metrics.span("capture"):
+                    audio = capture_audio()
+                self._offer("audio", self.audio_queue, (time.time(), audio, command_id))
+            except EOFError:
+                logging.info("Audio source exhausted, capture stage stopping")
+                return
+            except Exception as e:
+                logging.error(f"Error in capture stage: {e}")
+                print(f"Error in capture stage: {e}")
+                time.sleep(1)
+
+    def _recognize_loop(self):
+        while not self.stop_event.is_set():
+            item = self._take(self.audio_queue)
+            if item is None:
+                continue
+            captured_at, audio, command_trace.id = item
+            try:
+                command = transcribe_audio(audio)
+                if self.transcripts.deliver(captured_at, command):
+                    continue
+                if command:
+                    self._offer("command", self.command_queue, (command, command_trace.id))
+            except Exception as e:
+                logging.error(f"Error in recognize stage: {e}")
+
+    def _parse_loop(self):
+        while not self.stop_event.is_set():
+            item = self._take(self.command_queue)
+            if item is None:
+                continue
+            command, command_trace.id = item
+            try:
+                action = parse_command(self.user_id, command)
+                if action:
+                    self._offer("action", self.action_queue, (action, command_trace.id))
+            except Exception as e:
+                logging.error(f"Error in parse stage: {e}")
+
+    def _execute_loop(self):
+        while not self.stop_event.is_set():
+            item = self._take(self.action_queue)
+            if item is None:
+                continue
+            action, command_trace.id = item
+            try:
+                execute_action(self.user_id, action)
+            except SystemExit:
+                logging.info("Stop listening requested, shutting down pipeline")
+                self.stop()
+            except Exception as e:
+                logging.error(f"Error in execute stage: {e}")
+                print(f"Error in execute stage: {e}")
+                speak("There was an error. Restarting listening.", PRIORITY_LOW)
+
+class Session:
+    def __init__(self, user_id, capture_session, max_pending=4):
+        self.user_id = user_id
+        self.capture = capture_session
+        self.max_pending = max_pending
+        self.utterances = deque()
+        self.in_flight = False
+        self.actions = queue.Queue()
+        self.transcripts = TranscriptWaiters()
+        self.stop_event = threading.Event()
+        self.started_at = time.time()
+        self.processed = 0
+        self.commands = 0
+        self.dropped = 0
+        self.queue_waits = deque(maxlen=200)
+
+    def is_running(self):
+        return not self.stop_event.is_set()
+
+    def await_transcript(self, timeout=60):
+        return self.transcripts.wait(timeout)
+
+    def stats(self):
+        waits = sorted(self.queue_waits)
+        minutes = max((time.time() - self.started_at) / 60, 1 / 60)
+        return {
+            "processed": self.processed,
+            "commands": self.commands,
+            "dropped": self.dropped,
+            "pending": len(self.utterances),
+            "commands_per_minute": self.commands / minutes,
+            "queue_wait_avg": sum(waits) / len(waits) if waits else 0.0,
+            "queue_wait_p95": waits[int(len(waits) * 0.95)] if waits else 0.0,
+        }
+
+class SessionScheduler:
+    # Sessions share one worker pool for recognition and parsing. Sessions with pending
+    # utterances are served round-robin, one utterance at a time, so commands stay in
+    # order per session and a busy session cannot starve the others.
+    def __init__(self, workers=4, max_pending=4):
+        self.worker_count = workers
+        self.max_pending = max_pending
+        self.sessions = []
+        self.ready = deque()
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+
+    def add_session(self, user_id, capture_config):
+        session = Session(user_id, CaptureSession.from_config(capture_config), self.max_pending)
+        self.sessions.append(session)
+        return session
+
+    def start(self):
+        for session in self.sessions:
+            threading.Thread(target=self._capture_loop, args=(session,), name=f"nova-capture-{session.user_id}", daemon=True).start()
+            threading.Thread(target=self._execute_loop, args=(session,), name=f"nova-execute-{session.user_id}", daemon=True).start()
+        for i in range(self.worker_count):
+            threading.Thread(target=self._worker_loop, name=f"nova-worker-{i}", daemon=True).start()
+        logging.info(f"Session scheduler started with {len(self.sessions)} sessions and {self.worker_count} workers")
+
+    def stop(self):
+        self.stop_event.set()
+        for session in self.sessions:
+            session.stop_event.set()
+        with self.condition:
+            self.condition.notify_all()
+
+    def is_running(self):
+        return not self.stop_event.is_set() and any(session.is_running() for session in self.sessions)
+
+    def submit(self, session, audio):
+        with self.condition:
+            if len(session.utterances) >= session.max_pending:
+                session.utterances.popleft()
+                session.dropped += 1
+                logging.warning(f"Session {session.user_id} is falling behind, dropped oldest utterance")
+            session.utterances.append((time.time(), audio, current_command_id()))
+            if not session.in_flight and session not in self.ready:
+                self.ready.append(session)
+            self.condition.notify()
+
+    def _next(self):
+        with self.condition:
+            while not self.ready:
+                if self.stop_event.is_set():
+                    return None, None
+                self.condition.wait(0.5)
+            session = self.ready.popleft()
+            session.in_flight = True
+            return session, session.utterances.popleft()
+
+    def _release(self, session):
+        with self.condition:
+            session.in_flight = False
+            if session.utterances and session.is_running():
+                self.ready.append(session)
+                self.condition.notify()
+
+    def _capture_loop(self, session):
+        while session.is_running():
+            try:
+                begin_command()
+                with metrics.span("capture"):
+                    audio = session.capture.next_phrase()
+                self.submit(session, audio)
+            except EOFError:
+                logging.info(f"Audio source for {session.user_id} exhausted")
+                return
+            except Exception as e:
+                logging.error(f"Error capturing audio for {session.user_id}: {e}")
+                time.sleep(1)
+
+    def _worker_loop(self):
+        while not self.stop_event.is_set():
+            session, item = self._next()
+            if session is None:
+                continue
+            captured_at, audio, command_trace.id = item
+            session.queue_waits.append(time.time() - captured_at)
+            try:
+                command = transcribe_audio(audio)
+                session.processed += 1
+                if session.transcripts.deliver(captured_at, command) or not command:
+                    continue
+                action = parse_command(session.user_id, command)
+                if action:
+                    session.actions.put((action, command_trace.id))
+            except Exception as e:
+                logging.error(f"Error processing utterance for {session.user_id}: {e}")
+            finally:
+                self._release(session)
+
+    def _execute_loop(self, session):
+        session_context.session = session
+        while session.is_running():
+            try:
+                action, command_trace.id = session.actions.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                execute_action(session.user_id, action)
+                session.commands += 1
+            except SystemExit:
+                logging.info(f"Stop listening requested, closing session {session.user_id}")
+                session.stop_event.set()
+            except Exception as e:
+                logging.error(f"Error executing action for {session.user_id}: {e}")
+
+    def stats(self):
+        return {session.user_id: session.stats() for session in self.sessions}
+
+pipeline = None
+session_context = threading.local()
+
 def continuous_listen():
-    while True:
+    global pipeline
+    sessions_config = config.get("sessions")
+    if sessions_config:
+        scheduler_config = config.get("scheduler", {})
+        scheduler = SessionScheduler(workers=scheduler_config.get("workers", 4),
+                                     max_pending=scheduler_config.get("max_pending", 4))
+        for session_config in sessions_config:
+            scheduler.add_session(session_config["user_id"], session_config.get("capture", {}))
+        scheduler.start()
+        return scheduler
+
+    user_id = "default_user"
+    pipeline_config = config.get("pipeline", {})
+    pipeline = CommandPipeline(user_id,
+                               queue_size=pipeline_config.get("queue_size", 4),
+                               drop_policy=pipeline_config.get("drop_policy", "drop_oldest"))
+    pipeline.start()
+    return pipeline
+
+# Local command bus: length-prefixed JSON messages over a Unix socket (loopback TCP where unavailable)
+BUS_HEADER = struct.Struct("!I")
+
+def send_message(connection, payload):
+    data = json.dumps(payload).encode("utf-8")
+    connection.sendall(BUS_HEADER.pack(len(data)) + data)
+
+def receive_message(connection, max_size=65536):
+    header = receive_exactly(connection, BUS_HEADER.size)
+    if header is None:
+        return None
+    (length,) = BUS_HEADER.unpack(header)
+    if length > max_size:
+        raise ValueError(f"Message of {length} bytes exceeds the {max_size} byte limit")
+    data = receive_exactly(connection, length)
+    return json.loads(data) if data is not None else None
+
+def receive_exactly(connection, size):
+    data = b""
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+class BusSubscriber:
+    # Events are queued per subscriber and written by its own thread; a slow reader loses events instead of stalling NOVA
+    def __init__(self, connection, send_lock, events, max_queue=256):
+        self.connection = connection
+        self.send_lock = send_lock
+        self.events = set(events or ())
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def offer(self, event):
+        if self.events and event["event"] not in self.events:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        try:
+            while True:
+                event = self.queue.get()
+                if event is None:
+                    return
+                if self.dropped:
+                    event = dict(event, dropped=self.dropped)
+                    self.dropped = 0
+                with self.send_lock:
+                    send_message(self.connection, event)
+        except OSError:
+            pass
+
+class CommandBus:
+    def __init__(self, path=None, port=5056, max_pending=8, max_message=65536, key_path=None):
+        self.path = path if hasattr(socket, "AF_UNIX") else None
+        self.port = port
+        self.key_path = key_path or os.path.join("instance", "nova-bus.key")
+        self.key = None
+        self.max_message = max_message
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.server = None
+        self.listener = None
+        self.accepted = 0
+        self.rejected = 0
+
+    def _load_key(self):
+        # Shared secret the front-end reads from the same file; created once and kept across restarts
         try:
-            command = recognize_speech()
-            if command:
-                user_id = "default_user"  # This should be dynamically set for multi-user environments
-                action = parse_command(user_id, command)
+            with open(self.key_path) as key_file:
+                key = key_file.read().strip()
+            if key:
+                return key
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(self.key_path) or ".", exist_ok=True)
+        key = secrets.token_hex(32)
+        with os.fdopen(os.open(self.key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as key_file:
+            key_file.write(key)
+        logging.info(f"Created command bus key {self.key_path}")
+        return key
+
+    def start(self, listener=None):
+        self.listener = listener
+        self.key = self._load_key()
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            # Bind under a restrictive umask so the socket is never reachable by other users
+            umask = os.umask(0o077)
+            try:
+                self.server.bind(self.path)
+            finally:
+                os.umask(umask)
+            address = self.path
+        else:
+            self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server.bind(("127.0.0.1", self.port))
+            address = f"127.0.0.1:{self.port}"
+        self.server.listen()
+        threading.Thread(target=self._accept_loop, name="nova-bus", daemon=True).start()
+        threading.Thread(target=self._command_loop, name="nova-bus-commands", daemon=True).start()
+        logging.info(f"Command bus listening on {address}")
+
+    def stop(self):
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+            if self.path and os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def publish(self, kind, **fields):
+        if not self.subscribers:
+            return
+        event = dict(fields, type="event", event=kind, command_id=current_command_id(), time=time.time())
+        with self.lock:
+            for subscriber in self.subscribers:
+                subscriber.offer(event)
+
+    def _accept_loop(self):
+        while self.server is not None:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(connection,), name="nova-bus-client", daemon=True).start()
+
+    def _serve(self, connection):
+        subscriber = None
+        send_lock = threading.Lock()
+        try:
+            while True:
+                message = receive_message(connection, self.max_message)
+                if message is None:
+                    return
+                if not hmac.compare_digest(str(message.get("key", "")).encode("utf-8"), self.key.encode("utf-8")):
+                    logging.warning("Command bus message with a missing or wrong key rejected")
+                    with send_lock:
+                        send_message(connection, {"type": "error", "id": message.get("id"), "error": "Not authorized"})
+                    return
+                if message.get("type") == "command":
+                    reply = self._submit(message)
+                elif message.get("type") == "subscribe" and subscriber is None:
+                    # Confirm before registering so the reply always precedes the first event
+                    with send_lock:
+                        send_message(connection, {"type": "subscribed"})
+                    subscriber = BusSubscriber(connection, send_lock, message.get("events"))
+                    with self.lock:
+                        self.subscribers.append(subscriber)
+                    threading.Thread(target=subscriber.run, name="nova-bus-subscriber", daemon=True).start()
+                    continue
+                else:
+                    reply = {"type": "error", "error": f"Unexpected message type: {message.get('type')}"}
+                with send_lock:
+                    send_message(connection, reply)
+        except (OSError, ValueError) as e:
+            logging.debug(f"Command bus connection closed: {e}")
+        finally:
+            if subscriber is not None:
+                with self.lock:
+                    self.subscribers.remove(subscriber)
+                subscriber.queue.put(None)
+            connection.close()
+
+    def _submit(self, message):
+        text = str(message.get("text", "")).strip()
+        if not text:
+            return {"type": "error", "id": message.get("id"), "error": "Empty command"}
+        command_id = f"bus-{next(command_ids):06x}"
+        try:
+            self.pending.put_nowait((command_id, message.get("user_id", "default_user"), text))
+        except queue.Full:
+            # Backpressure: the caller should retry later rather than pile up work
+            self.rejected += 1
+            return {"type": "busy", "id": message.get("id"), "pending": self.pending.qsize(), "retry_after": 1}
+        self.accepted += 1
+        return {"type": "accepted", "id": message.get("id"), "command_id": command_id}
+
+    def _command_loop(self):
+        while True:
+            command_id, user_id, text = self.pending.get()
+            command_trace.id = command_id
+            logging.info(f"Command received over the bus: {text}")
+            self.publish("recognized", user_id=user_id, text=text, source="bus")
+            try:
+                action = parse_command(user_id, text)
                 if action:
                     execute_action(user_id, action)
+            except SystemExit:
+                logging.info("Stop listening requested over the command bus")
+                if self.listener is not None:
+                    self.listener.stop()
+            except Exception as e:
+                logging.error(f"Error running bus command: {e}")
+
+    def stats(self):
+        return {"accepted": self.accepted, "rejected": self.rejected, "pending": self.pending.qsize(),
+                "subscribers": len(self.subscribers)}
+
+bus_config = config.get("command_bus", {})
+command_bus = CommandBus(path=bus_config.get("path", os.path.join("instance", "nova.sock")),
+                         port=bus_config.get("port", 5056),
+                         max_pending=bus_config.get("max_pending", 8),
+                         key_path=bus_config.get("key_path"))
+
+def publish_event(kind, **fields):
+    command_bus.publish(kind, **fields)
+
+config_section_handlers = {}
+# Sections that are read on every use and need no handler to take effect
+LIVE_CONFIG_SECTIONS = {"streaming", "search_url", "text_injection"}
+
+def on_config_change(*sections):
+    def register(handler):
+        for section in sections:
+            config_section_handlers[section] = handler
+        return handler
+    return register
+
+@on_config_change("program_mapping")
+def reload_program_mapping(program_mapping):
+    intent_index.invalidate()
+    if phrase_cache_enabled and phrase_cache.voice_id:
+        threading.Thread(target=phrase_cache.render_all, args=(phrase_cache.voice_id,), daemon=True).start()
+
+@on_config_change("custom_commands")
+def reload_custom_commands(custom_commands):
+    intent_index.invalidate()
+    command_registry.sync_custom_commands(custom_commands or {})
+
+@on_config_change("intent_matcher")
+def reload_intent_matcher(intent_matcher):
+    intent_index.fuzzy_cutoff = (intent_matcher or {}).get("fuzzy_cutoff", 0.88)
+
+@on_config_change("voice_id")
+def reload_voice(voice_id):
+    set_voice(voice_id)
+
+@on_config_change("openai_api_key", "openai_api_base")
+def reload_openai(value):
+    configure_openai(openai.preload())
+
+def apply_config_changes(new_config):
+    changed = [key for key in set(config) | set(new_config) if config.get(key) != new_config.get(key)]
+    for key in changed:
+        if key in new_config:
+            config[key] = new_config[key]
+        else:
+            config.pop(key, None)
+    for key in changed:
+        handler = config_section_handlers.get(key)
+        if handler is not None:
+            try:
+                handler(config.get(key))
+                logging.info(f"Reloaded configuration section '{key}'")
+            except Exception as e:
+                logging.error(f"Could not reload configuration section '{key}': {e}")
+        elif key not in LIVE_CONFIG_SECTIONS:
+            logging.info(f"Configuration section '{key}' changed and takes effect after a restart")
+    return changed
+
+class ConfigWatcher:
+    def __init__(self, path='config.json', interval=1.0):
+        self.path = path
+        self.interval = interval
+        self.signature = self._stat()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def check(self):
+        signature = self._stat()
+        if signature is None or signature == self.signature:
+            return []
+        self.signature = signature
+        try:
+            with open(self.path) as config_file:
+                new_config = json.load(config_file)
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not reload configuration: {e}")
+            return []
+        return apply_config_changes(new_config)
+
+    def start(self):
+        def run():
+            while True:
+                time.sleep(self.interval)
+                self.check()
+        threading.Thread(target=run, name="nova-config", daemon=True).start()
+
+config_watcher = ConfigWatcher()
+
+def warm_up():
+    # Load the slow subsystems in the background while the microphone is already listening
+    started = time.perf_counter()
+    for module in (openai, pyautogui):
+        try:
+            module.preload()
         except Exception as e:
-            logging.error(f"Error in continuous listening loop: {e}")
-            print(f"Error in continuous listening loop: {e}")
-            speak("There was an error. Restarting listening.")
+            logging.warning(f"Could not preload {module._name}: {e}")
+    try:
+        set_voice(config["voice_id"])
+        list_voices()
+    except Exception as e:
+        logging.error(f"Could not initialize text-to-speech: {e}")
+    record_startup_phase("background warm-up", started)
+    logging.info(startup_report())
 
 def main():
+    phase_started = time.perf_counter()
+    reminder_outbox.start()
+    config_watcher.start()
+    metrics.start()
+    listener = continuous_listen()
+    if bus_config.get("enabled", True):
+        try:
+            command_bus.start(listener)
+        except OSError as e:
+            logging.error(f"Could not start the command bus: {e}")
+            print(f"Could not start the command bus: {e}")
     speak("Hello, I am ready for your command")
-    list_voices()
-    set_voice(config["voice_id"])
-    listener_thread = threading.Thread(target=continuous_listen)
-    listener_thread.daemon = True
-    listener_thread.start()
+    record_startup_phase("start listener", phase_started)
+    record_startup_phase("ready for commands", startup_started)
+    print(startup_report())
+    threading.Thread(target=warm_up, name="nova-warm-up", daemon=True).start()
 
     # Keep the main thread alive
     try:
-        while True:
+        while listener.is_running():
             time.sleep(1)
     except KeyboardInterrupt:
         logging.info("Nova program terminated by user.")
+        logging.info(f"Intent matcher stats: {intent_index.stats()}")
+        logging.info(f"Response cache stats: {response_cache.stats()}")
+        logging.info(f"Speech stats: {speech_worker.stats()}")
+        logging.info(f"Speech recognition stats: {asr_router.stats()}")
+        logging.info(f"Command stats: {command_registry.stats()}")
+        logging.info(f"Command bus stats: {command_bus.stats()}")
+        logging.info(f"Command history stats: {command_history.stats()}")
+        if isinstance(listener, SessionScheduler):
+            logging.info(f"Session stats: {listener.stats()}")
+        context_manager.snapshot()
         print("Nova program terminated by user.")
-        speak("Goodbye!")
+        speak("Goodbye!", PRIORITY_HIGH)
+    speech_worker.flush(timeout=5)
+    metrics.save()
+    command_bus.stop()
+    command_history.flush()
+
+class RateLimiter:
+    # Spaces calls evenly so that at most `rate` start per second, across all threads
+    def __init__(self, rate=None):
+        self.interval = 1 / rate if rate else 0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def process_batch_line(line_number, line, rate_limiter, default_user):
+    result = {"line": line_number}
+    try:
+        item = json.loads(line)
+        if isinstance(item, str):
+            item = {"command": item}
+        command = item["command"]
+        user_id = item.get("user_id", default_user)
+        if "id" in item:
+            result["id"] = item["id"]
+        result.update(user_id=user_id, command=command)
+        rate_limiter.acquire()
+        started = time.perf_counter()
+        action = parse_command(user_id, command)
+        result["parse_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        result["action"] = action
+        if not action:
+            result["error"] = "could not parse command"
+            return result
+        plan = execute_action(user_id, action, dry_run=True)
+        if plan is None:
+            result["error"] = "command not recognized"
+        else:
+            result.update(plan)
+    except (ValueError, KeyError, TypeError) as e:
+        result["error"] = f"invalid input: {e}"
+    except Exception as e:
+        logging.error(f"Error processing batch line {line_number}: {e}")
+        result["error"] = str(e)
+    return result
+
+def run_batch(source, output, workers=4, rate=None, user_id="batch"):
+    # Parse commands from a JSONL stream in parallel and write dry-run results in input order
+    global speech_enabled
+    speech_enabled = False
+    rate_limiter = RateLimiter(rate)
+    in_flight = deque()
+    processed = 0
+    started = time.perf_counter()
+
+    def write_ready(block):
+        nonlocal processed
+        while in_flight and (block or in_flight[0].done()):
+            output.write(json.dumps(in_flight.popleft().result()) + "\n")
+            output.flush()
+            processed += 1
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nova-batch") as executor:
+        for line_number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            in_flight.append(executor.submit(process_batch_line, line_number, line, rate_limiter, user_id))
+            write_ready(block=False)
+            # Keep a bounded window so huge inputs stream instead of piling up in memory
+            while len(in_flight) >= workers * 4:
+                in_flight[0].result()
+                write_ready(block=False)
+        write_ready(block=True)
+    elapsed = time.perf_counter() - started
+    logging.info(f"Batch processed {processed} commands in {elapsed:.1f} s")
+    return processed
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(description="Parse commands from a JSONL file without the microphone. "
+                                                 "Actions are resolved in dry-run mode: nothing is launched or spoken.")
+    parser.add_argument("--batch", required=True, help="JSONL file of commands, or - for stdin")
+    parser.add_argument("--output", default="-", help="Where to write JSONL results (default stdout)")
+    parser.add_argument("--workers", type=int, default=4, help="Commands parsed in parallel")
+    parser.add_argument("--rate", type=float, help="Maximum commands started per second")
+    parser.add_argument("--user-id", default="batch", help="User for lines without a user_id")
+    parser.add_argument("--use-cache", action="store_true", help="Answer repeated commands from a response cache")
+    args = parser.parse_args(argv)
+
+    # A dry run must not touch the live context or cache: give it in-memory ones that start empty
+    global context_manager, response_cache, response_cache_config
+    context_manager = ContextManager(max_users=context_config.get("max_users", 100),
+                                     max_turns=context_config.get("max_turns", 20),
+                                     token_budget=context_config.get("token_budget", 800))
+    response_cache = ResponseCache(max_entries=response_cache_config.get("max_entries", 512),
+                                   ttl_seconds=response_cache_config.get("ttl_seconds", 86400))
+    response_cache_config = dict(response_cache_config, enabled=args.use_cache)
+
+    source = sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        # Status messages go to stderr so stdout carries only results
+        with redirect_stdout(sys.stderr):
+            processed = run_batch(source, output, workers=max(1, args.workers), rate=args.rate, user_id=args.user_id)
+        print(f"Processed {processed} commands", file=sys.stderr)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+def import_logs_main(argv):
+    parser = argparse.ArgumentParser(description="Import old personal_log_<timestamp>.txt files into the personal log store.")
+    parser.add_argument("--import-logs", nargs="?", const=".", required=True, metavar="DIRECTORY",
+                        help="Directory holding the text files (default the current directory)")
+    parser.add_argument("--user-id", default="default_user", help="User the entries belong to")
+    parser.add_argument("--remove", action="store_true", help="Delete each file once it has been imported")
+    args = parser.parse_args(argv)
+    count = personal_logs.import_files(args.user_id, args.import_logs, remove=args.remove)
+    print(f"Imported {count} personal logs for {args.user_id}")
 
 if __name__ == "__main__":
-    main()
+    if "--batch" in sys.argv[1:]:
+        batch_main(sys.argv[1:])
+    elif "--import-logs" in sys.argv[1:]:
+        import_logs_main(sys.argv[1:])
+    else:
+        main()
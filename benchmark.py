@@ -0,0 +1,442 @@
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import math
+import array
+import wave
+import importlib
+import types
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Runs the recognize -> parse -> execute -> speak path offline. Speech comes from WAV fixtures,
+# GPT-4 and Google Calendar are local HTTP stand-ins, and text-to-speech and the desktop are no-ops.
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FIXTURES = os.path.join(REPO_DIR, "benchmarks", "fixtures")
+
+CALENDAR_DISCOVERY = {
+    "kind": "discovery#restDescription",
+    "discoveryVersion": "v1",
+    "id": "calendar:v3",
+    "name": "calendar",
+    "version": "v3",
+    "protocol": "rest",
+    "rootUrl": "",
+    "servicePath": "calendar/v3/",
+    "batchPath": "batch/calendar/v3",
+    "parameters": {},
+    "schemas": {"Event": {"id": "Event", "type": "object", "properties": {}}},
+    "resources": {
+        "events": {
+            "methods": {
+                "insert": {
+                    "id": "calendar.events.insert",
+                    "path": "calendars/{calendarId}/events",
+                    "httpMethod": "POST",
+                    "parameters": {"calendarId": {"type": "string", "required": True, "location": "path"}},
+                    "parameterOrder": ["calendarId"],
+                    "request": {"$ref": "Event"},
+                    "response": {"$ref": "Event"},
+                }
+            }
+        }
+    },
+}
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "p50_ms": samples[int(len(samples) * 0.50)] * 1000,
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+        "p99_ms": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000,
+        "max_ms": samples[-1] * 1000,
+    }
+
+def write_tone_wav(path, seed, sample_rate=16000):
+    # A burst the energy detector treats as speech, surrounded by quiet room noise
+    rng = random.Random(seed)
+    samples = array.array("h")
+    for _ in range(int(sample_rate * 0.6)):
+        samples.append(rng.randint(-30, 30))
+    frequency = 180 + seed % 7 * 40
+    for i in range(int(sample_rate * (0.6 + seed % 3 * 0.2))):
+        samples.append(int(6000 * math.sin(2 * math.pi * frequency * i / sample_rate)) + rng.randint(-200, 200))
+    for _ in range(int(sample_rate * 0.8)):
+        samples.append(rng.randint(-30, 30))
+    with wave.open(path, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(samples.tobytes())
+
+def load_fixtures(directory, synthetic_dir):
+    # Missing recordings are generated in the scratch directory, never next to the manifest
+    with open(os.path.join(directory, "manifest.json")) as manifest_file:
+        fixtures = json.load(manifest_file)
+    for i, fixture in enumerate(fixtures):
+        fixture["path"] = os.path.abspath(os.path.join(directory, fixture["wav"]))
+        if not os.path.exists(fixture["path"]):
+            print(f"Generating synthetic audio for '{fixture['transcript']}'")
+            fixture["path"] = os.path.join(synthetic_dir, f"{i:03d}_{os.path.basename(fixture['wav'])}")
+            write_tone_wav(fixture["path"], i)
+    return fixtures
+
+class FakeServices:
+    # One local HTTP server answers both the OpenAI chat API and the Calendar batch API
+    def __init__(self, actions, latency_ms=0, jitter_ms=0):
+        self.actions = actions
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.calls = {"chat": 0, "calendar": 0}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="benchmark-fake-services", daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+
+    def _count(self, name):
+        with self.lock:
+            self.calls[name] += 1
+
+    def _delay(self):
+        delay = self.latency_ms + (random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+        time.sleep(max(0, delay) / 1000)
+
+    def answer(self, messages):
+        prompt = messages[-1]["content"] if messages else ""
+        command = prompt.split("\n")[0].replace("Command:", "", 1).strip()
+        return self.actions.get(command.lower(), command)
+
+    def _handler(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _body(self):
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def _send(self, status, content_type, body):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                if self.path.endswith("/chat/completions"):
+                    self._chat(json.loads(self._body()))
+                elif self.path.startswith("/batch/calendar/v3"):
+                    self._calendar_batch(self._body())
+                elif self.path.startswith("/calendar/v3/calendars/"):
+                    services._count("calendar")
+                    self._body()
+                    self._send(200, "application/json", json.dumps({"id": f"event{services.calls['calendar']}"}).encode())
+                else:
+                    self._send(404, "application/json", b'{"error": "not found"}')
+
+            def _chat(self, request):
+                services._count("chat")
+                services._delay()
+                content = services.answer(request.get("messages", []))
+                created = int(time.time())
+                if request.get("stream"):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.end_headers()
+                    for piece in re.findall(r"\S+\s*", content) or [content]:
+                        chunk = {"id": "chatcmpl-benchmark", "object": "chat.completion.chunk", "created": created,
+                                 "model": request.get("model"),
+                                 "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    return
+                response = {"id": "chatcmpl-benchmark", "object": "chat.completion", "created": created,
+                            "model": request.get("model"),
+                            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}}
+                self._send(200, "application/json", json.dumps(response).encode())
+
+            def _calendar_batch(self, body):
+                boundary = "benchmark_batch_boundary"
+                parts = []
+                for content_id in re.findall(rb"Content-ID: <([^>]+)>", body):
+                    services._count("calendar")
+                    payload = json.dumps({"id": f"event{services.calls['calendar']}"})
+                    parts.append(f"--{boundary}\r\nContent-Type: application/http\r\n"
+                                 f"Content-ID: <response-{content_id.decode()}>\r\n\r\n"
+                                 f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n{payload}\r\n")
+                self._send(200, f"multipart/mixed; boundary={boundary}", ("".join(parts) + f"--{boundary}--\r\n").encode())
+
+        return Handler
+
+class NullEngine:
+    # Text-to-speech sink that records when each command's speech finished
+    def __init__(self, nova):
+        self.nova = nova
+        self.finished = {}
+        self.spoken = 0
+
+    def say(self, text):
+        self.spoken += 1
+
+    def runAndWait(self):
+        command_id = self.nova.current_command_id()
+        if command_id is not None:
+            self.finished[command_id] = time.perf_counter()
+
+    def connect(self, *args):
+        pass
+
+    def stop(self):
+        pass
+
+    def getProperty(self, name):
+        return []
+
+    def setProperty(self, name, value):
+        pass
+
+class FakeProcess:
+    pid = 0
+    returncode = 0
+
+    def poll(self):
+        return None
+
+class FakeProcessManager:
+    def __init__(self):
+        self.launched = []
+
+    def launch(self, program, executable, args=()):
+        self.launched.append((program, list(args)))
+        return FakeProcess()
+
+    def close(self, program, executable, timeout=3):
+        return 0
+
+    def running(self, program_mapping):
+        return {program: False for program in program_mapping}
+
+def fake_pyautogui():
+    module = types.SimpleNamespace()
+    module.hotkey = lambda *keys, **kwargs: None
+    module.typewrite = lambda text, interval=0: None
+    module.getWindowsWithTitle = lambda title: []
+    return module
+
+class FixtureCapture:
+    # Wraps a real capture session over a WAV file and tags the phrase with its transcript
+    def __init__(self, nova, fixture):
+        self.session = nova.CaptureSession.from_config({"source": fixture["path"]})
+        self.transcript = fixture["transcript"]
+
+    def next_phrase(self):
+        audio = self.session.next_phrase()
+        audio.transcript = self.transcript
+        return audio
+
+    def close(self):
+        self.session.close()
+
+def prepare_workdir(workdir, services, args):
+    with open(os.path.join(REPO_DIR, "config.json")) as config_file:
+        base_config = json.load(config_file)
+    base_config.update({
+        "openai_api_key": "benchmark",
+        "openai_api_base": f"{services.url}/v1",
+        "streaming": args.streaming,
+        "intent_matcher": {"enabled": not args.no_intent_matcher},
+        "response_cache": {"enabled": not args.no_cache},
+        "phrase_cache": {"enabled": False},
+        "asr": {"engine": "stub"},
+        "metrics": {"enabled": False},
+        "logging": {"path": os.path.join("logs", "Nova.log"), "debug_per_second": 0},
+        "calendar": {"api_endpoint": services.url, "outbox_path": os.path.join("cache", "calendar_outbox.db")},
+    })
+    base_config.setdefault("program_mapping", {}).setdefault("brave browser", "brave")
+    with open(os.path.join(workdir, "config.json"), "w") as config_file:
+        json.dump(base_config, config_file, indent=2)
+
+def load_nova(services, args):
+    sys.path.insert(0, REPO_DIR)
+    nova = importlib.import_module("NOVA")
+    nova.engine = NullEngine(nova)
+    nova.pyautogui = fake_pyautogui()
+    nova.pyperclip = None
+    nova.process_manager = FakeProcessManager()
+
+    @nova.asr_backend("fixture")
+    def recognize_fixture(audio, options, timeout=None):
+        time.sleep(options.get("latency_ms", 0) / 1000)
+        return audio.transcript
+
+    nova.asr_router = nova.ASRRouter(engine_name="fixture", options={"fixture": {"latency_ms": args.asr_latency}})
+    document = dict(CALENDAR_DISCOVERY, rootUrl=f"{services.url}/", baseUrl=f"{services.url}/calendar/v3/")
+    from google.auth.credentials import AnonymousCredentials
+    nova.calendar_service = nova.discovery.build_from_document(document, credentials=AnonymousCredentials())
+    nova.reminder_outbox.start()
+    return nova
+
+def run_command(nova, fixture, user_id):
+    capture = FixtureCapture(nova, fixture)
+    nova.session_context.capture = capture
+    started = time.perf_counter()
+    error = None
+    try:
+        command = nova.recognize_speech()
+        command_id = nova.current_command_id()
+        action = nova.parse_command(user_id, command) if command else None
+        if action:
+            nova.execute_action(user_id, action)
+        else:
+            error = "no action"
+    except SystemExit:
+        command_id = nova.current_command_id()
+    except Exception as e:
+        command_id = nova.current_command_id()
+        error = str(e)
+    finally:
+        capture.close()
+        nova.session_context.capture = None
+    return {"command_id": command_id, "transcript": fixture["transcript"], "started": started,
+            "executed": time.perf_counter(), "error": error}
+
+def run_scenario(nova, services, fixtures, commands, concurrency):
+    nova.metrics = nova.MetricsStore(sample_size=max(1000, commands * 2))
+    nova.engine.finished.clear()
+    # Each scenario starts with an empty response cache, so earlier runs cannot answer its GPT-4 calls
+    nova.response_cache = nova.ResponseCache(max_entries=nova.response_cache.max_entries,
+                                             ttl_seconds=nova.response_cache.ttl_seconds)
+    chat_calls = services.calls["chat"]
+    workload = [fixtures[i % len(fixtures)] for i in range(commands)]
+    started = time.perf_counter()
+    if concurrency <= 1:
+        results = [run_command(nova, fixture, "benchmark") for fixture in workload]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="benchmark") as executor:
+            results = list(executor.map(lambda item: run_command(nova, item[1], f"benchmark-{item[0] % concurrency}"),
+                                        enumerate(workload)))
+    nova.speech_worker.flush(timeout=60)
+    wall = time.perf_counter() - started
+    chat_calls = services.calls["chat"] - chat_calls
+
+    end_to_end = []
+    for result in results:
+        finished = max(result["executed"], nova.engine.finished.get(result["command_id"], 0))
+        end_to_end.append(finished - result["started"])
+    with nova.metrics.lock:
+        stages = {stage: percentiles(histogram["samples"]) for stage, histogram in nova.metrics.histograms.items()}
+        failures = {f"{stage}:{status}": value for (stage, status), value in nova.metrics.counters.items() if status != "ok"}
+    return {
+        "commands": commands,
+        "concurrency": concurrency,
+        "errors": sum(1 for result in results if result["error"]),
+        "stage_errors": failures,
+        "wall_seconds": wall,
+        "commands_per_second": commands / wall if wall else 0.0,
+        "openai_calls": chat_calls,
+        "end_to_end": percentiles(end_to_end),
+        "stages": stages,
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def print_scenario(name, result, baseline=None):
+    print(f"\n{name}: {result['commands']} commands, concurrency {result['concurrency']}, "
+          f"{result['commands_per_second']:.1f} commands/s, {result['errors']} errors, "
+          f"{result.get('openai_calls', 0)} GPT-4 calls")
+    rows = [("end to end", result["end_to_end"])] + sorted(result["stages"].items())
+    base_rows = dict([("end to end", baseline["end_to_end"])] + list(baseline["stages"].items())) if baseline else {}
+    for stage, stats in rows:
+        if not stats.get("count"):
+            continue
+        line = f"  {stage:<12} p50 {stats['p50_ms']:8.2f} ms  p95 {stats['p95_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms"
+        previous = base_rows.get(stage, {})
+        if previous.get("p95_ms"):
+            line += f"  (p95 {(stats['p95_ms'] / previous['p95_ms'] - 1) * 100:+.0f}% vs baseline)"
+        print(line)
+    if baseline and baseline.get("commands_per_second"):
+        print(f"  throughput {(result['commands_per_second'] / baseline['commands_per_second'] - 1) * 100:+.0f}% vs baseline")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NOVA command path offline.")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="Directory with manifest.json and WAV files")
+    parser.add_argument("--commands", type=int, default=50, help="Commands per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="Workers for the concurrent scenario")
+    parser.add_argument("--openai-latency", type=float, default=300, help="Fake GPT-4 response time in ms")
+    parser.add_argument("--openai-jitter", type=float, default=50, help="Random variation of the GPT-4 response time in ms")
+    parser.add_argument("--asr-latency", type=float, default=150, help="Simulated speech recognition time in ms")
+    parser.add_argument("--streaming", action="store_true", help="Use streaming GPT-4 responses")
+    parser.add_argument("--no-intent-matcher", action="store_true", help="Send every command to GPT-4")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the response cache")
+    parser.add_argument("--output", help="Where to save the JSON results (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="nova-benchmark-")
+    synthetic_dir = os.path.join(workdir, "fixtures")
+    os.makedirs(synthetic_dir)
+    fixtures = load_fixtures(args.fixtures, synthetic_dir)
+    actions = {fixture["transcript"].lower(): fixture.get("action", fixture["transcript"]) for fixture in fixtures}
+    services = FakeServices(actions, latency_ms=args.openai_latency, jitter_ms=args.openai_jitter)
+    services.start()
+
+    original_dir = os.getcwd()
+    output = os.path.abspath(args.output or os.path.join(REPO_DIR, "benchmarks", "results", time.strftime("%Y%m%d_%H%M%S") + ".json"))
+    try:
+        prepare_workdir(workdir, services, args)
+        os.chdir(workdir)
+        nova = load_nova(services, args)
+        run_scenario(nova, services, fixtures, len(fixtures), 1)
+        results = {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "settings": vars(args),
+            "sequential": run_scenario(nova, services, fixtures, args.commands, 1),
+            "concurrent": run_scenario(nova, services, fixtures, args.commands, args.concurrency),
+        }
+        nova.reminder_outbox.flush_once()
+        results["fake_service_calls"] = dict(services.calls)
+    finally:
+        os.chdir(original_dir)
+        services.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    for name in ("sequential", "concurrent"):
+        print_scenario(name, results[name], baseline.get(name) if baseline else None)
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f"\nResults saved to {output}")
+
+if __name__ == "__main__":
+    main()
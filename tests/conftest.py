@@ -0,0 +1,35 @@
+import importlib.util
+import os
+import shutil
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def workdir(tmp_path_factory):
+    # NOVA and the front-end read config.json and write logs/ and instance/ relative to the working directory
+    path = tmp_path_factory.mktemp("nova")
+    shutil.copy(os.path.join(REPO_DIR, "config.json"), path)
+    os.makedirs(path / "logs")
+    original_dir = os.getcwd()
+    os.chdir(path)
+    yield path
+    os.chdir(original_dir)
+
+
+@pytest.fixture(scope="session")
+def nova(workdir):
+    sys.path.insert(0, REPO_DIR)
+    import NOVA
+    return NOVA
+
+
+@pytest.fixture(scope="session")
+def frontend(workdir):
+    spec = importlib.util.spec_from_file_location("nova_frontend", os.path.join(REPO_DIR, "NOVA-frontend.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
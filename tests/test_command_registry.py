@@ -0,0 +1,56 @@
+import pytest
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def registry(nova, monkeypatch, calls):
+    monkeypatch.setitem(nova.config, "custom_commands", {"good morning": "current time"})
+    registry = nova.CommandRegistry()
+    for verb, name in [("open", "open_program"), ("close", "close_program"), ("set", "set_value"),
+                       ("set reminder", "set_reminder")]:
+        registry.register(verb, lambda user_id, argument, name=name: calls.append((name, argument)), name=name)
+    registry.register("current time", lambda user_id, argument: calls.append(("speak_current_time", argument)),
+                      name="speak_current_time", takes_argument=False)
+    return registry
+
+
+def test_verb_at_the_start(registry, calls):
+    assert registry.dispatch("alice", "Open notepad")
+    assert calls == [("open_program", "notepad")]
+
+
+def test_longest_verb_wins(registry, calls):
+    assert registry.dispatch("alice", "set reminder call mom")
+    assert calls == [("set_reminder", "call mom")]
+
+
+@pytest.mark.parametrize("reply", ["I can't close notepad", "Sorry, I won't close notepad",
+                                   "I'm unable to open calculator for you"])
+def test_refusal_is_not_dispatched(registry, calls, reply):
+    assert not registry.dispatch("alice", reply)
+    assert calls == []
+
+
+def test_verb_without_argument_inside_a_reply(registry, calls):
+    assert registry.dispatch("alice", "Sure, here is the current time.")
+    assert calls == [("speak_current_time", "")]
+
+
+def test_custom_command(registry, calls):
+    assert registry.dispatch("alice", "Good morning")
+    assert calls == [("speak_current_time", "")]
+
+
+def test_dry_run_does_not_call_the_handler(registry, calls):
+    plan = registry.dispatch("alice", "open notepad", dry_run=True)
+    assert plan == {"handler": "open_program", "argument": "notepad", "resolved_action": "open notepad"}
+    assert calls == []
+
+
+def test_unknown_action(registry, calls):
+    assert not registry.dispatch("alice", "dance")
+    assert calls == []
@@ -0,0 +1,44 @@
+import pytest
+
+
+@pytest.fixture
+def index(nova, monkeypatch):
+    monkeypatch.setitem(nova.config, "program_mapping", {"notepad": "notepad.exe", "calculator": "calc.exe"})
+    monkeypatch.setitem(nova.config, "custom_commands", {"good morning": "current time"})
+    return nova.IntentIndex(fuzzy_cutoff=0.88)
+
+
+def test_exact_phrases(index):
+    assert index.match("what time is it") == "current time"
+    assert index.match("Hey Nova, launch the calculator please") == "open calculator"
+    assert index.match("kill notepad") == "close notepad"
+    assert index.match("stop listening") == "stop listening"
+    assert index.match("good morning") == "current time"
+
+
+def test_argument_verbs(index):
+    assert index.match("search for cheap flights") == "search cheap flights"
+    assert index.match("remind me to call mom") == "set reminder call mom"
+
+
+def test_fuzzy_match(index):
+    assert index.match("opn notepad") == "open notepad"
+    assert index.match("whats the tim") == "current time"
+    assert index.stats()["fuzzy_hits"] == 2
+
+
+@pytest.mark.parametrize("command", ["stop listing", "lose notepad", "start a personal blog", "quite notepad"])
+def test_dangerous_intents_need_an_exact_match(index, command):
+    assert index.match(command) is None
+
+
+def test_unknown_command(index):
+    assert index.match("tell me a joke about penguins") is None
+    assert index.stats()["misses"] == 1
+
+
+def test_rebuilds_after_invalidate(index, nova, monkeypatch):
+    assert index.match("open paint") is None
+    monkeypatch.setitem(nova.config, "program_mapping", {"paint": "mspaint.exe"})
+    index.invalidate()
+    assert index.match("open paint") == "open paint"
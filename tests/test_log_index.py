@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+
+def write_lines(path, lines):
+    with open(path, "a") as log_file:
+        for timestamp, level, message in lines:
+            log_file.write(json.dumps({"timestamp": timestamp, "level": level, "message": message}) + "\n")
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = str(tmp_path / "Nova.log")
+    write_lines(path, [
+        ("2026-10-01 08:00:00,000", "INFO", "NOVA started"),
+        ("2026-10-01 09:30:00,000", "WARNING", "Microphone is quiet"),
+        ("2026-10-02 10:00:00,000", "ERROR", "Could not reach GPT-4"),
+        ("2026-10-03 11:00:00,000", "INFO", "Opening notepad"),
+    ])
+    return path
+
+
+@pytest.fixture
+def index(frontend, log_path, tmp_path):
+    index = frontend.LogIndex(log_path, str(tmp_path / "log_index.db"))
+    index.refresh()
+    return index
+
+
+def messages(entries):
+    return [entry["message"] for entry in entries]
+
+
+def test_newest_first(index):
+    assert messages(index.query()) == ["Opening notepad", "Could not reach GPT-4", "Microphone is quiet", "NOVA started"]
+    assert index.counts() == {"info": 2, "warning": 1, "error": 1, "debug": 0}
+
+
+def test_filters(index):
+    assert messages(index.query(level="INFO")) == ["Opening notepad", "NOVA started"]
+    assert messages(index.query(since="2026-10-01 09:00", until="2026-10-02 23:59")) == ["Could not reach GPT-4", "Microphone is quiet"]
+
+
+def test_paging(index):
+    first_page = index.query(limit=3)
+    assert messages(index.query(before=first_page[-1]["id"], limit=3)) == ["NOVA started"]
+
+
+def test_only_new_lines_are_indexed(index, log_path):
+    write_lines(log_path, [("2026-10-04 12:00:00,000", "ERROR", "Speech engine stopped")])
+    index.refresh()
+    assert messages(index.query(limit=2)) == ["Speech engine stopped", "Opening notepad"]
+    assert index.counts()["error"] == 2
+
+
+def test_follows_rotation(index, log_path):
+    write_lines(log_path, [("2026-10-04 12:00:00,000", "INFO", "Written before the rotation")])
+    os.rename(log_path, f"{log_path}.1")
+    write_lines(log_path, [("2026-10-05 08:00:00,000", "INFO", "Written after the rotation")])
+    index.refresh()
+    assert messages(index.query(limit=3)) == ["Written after the rotation", "Written before the rotation", "Opening notepad"]
+
+    os.remove(f"{log_path}.1")
+    index.refresh()
+    assert messages(index.query()) == ["Written after the rotation"]
+    assert index.counts()["info"] == 1
@@ -0,0 +1,49 @@
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def store(nova, tmp_path):
+    return nova.PersonalLogStore(path=str(tmp_path / "personal_logs.db"))
+
+
+def test_search_finds_the_matching_entry(store):
+    store.append("alice", "Went hiking in the mountains with Bob")
+    store.append("alice", "Finished the quarterly budget report")
+    results = store.search("alice", "find my log about hiking")
+    assert [result["content"] for result in results] == ["Went hiking in the mountains with Bob"]
+
+
+def test_users_only_see_their_own_logs(store):
+    store.append("alice", "Secret hiking plans")
+    assert store.search("bob", "hiking") == []
+
+
+def test_falls_back_to_any_term(store):
+    store.append("alice", "Draft of the budget report")
+    results = store.search("alice", "budget meeting")
+    assert [result["content"] for result in results] == ["Draft of the budget report"]
+
+
+def test_stopwords_only_query(store):
+    store.append("alice", "Went hiking")
+    assert store.search("alice", "my log about the") == []
+
+
+def test_entries_are_append_only(store):
+    entry_id = store.append("alice", "Went hiking")
+    with pytest.raises(sqlite3.DatabaseError):
+        store.db.execute("DELETE FROM log_entries WHERE id = ?", (entry_id,))
+    with pytest.raises(sqlite3.DatabaseError):
+        store.db.execute("UPDATE log_entries SET content = '' WHERE id = ?", (entry_id,))
+
+
+def test_import_files_once(store, tmp_path):
+    (tmp_path / "personal_log_20240101_120000.txt").write_text("New year's walk by the lake")
+    (tmp_path / "notes.txt").write_text("not a personal log")
+    assert store.import_files("alice", str(tmp_path)) == 1
+    assert store.import_files("alice", str(tmp_path)) == 0
+    results = store.search("alice", "lake")
+    assert len(results) == 1
+    assert results[0]["content"] == "New year's walk by the lake"
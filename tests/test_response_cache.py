@@ -0,0 +1,33 @@
+def test_least_recently_used_entry_is_evicted(nova):
+    cache = nova.ResponseCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", "open notepad")
+    cache.put("b", "current time")
+    assert cache.get("a") == "open notepad"
+    cache.put("c", "running programs")
+    assert cache.get("b") is None
+    assert cache.get("a") == "open notepad"
+    assert cache.get("c") == "running programs"
+    assert cache.stats()["entries"] == 2
+
+
+def test_expired_entry_misses(nova, monkeypatch):
+    cache = nova.ResponseCache(ttl_seconds=10)
+    now = nova.time.time()
+    monkeypatch.setattr(nova.time, "time", lambda: now)
+    cache.put("a", "open notepad")
+    monkeypatch.setattr(nova.time, "time", lambda: now + 11)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["bytes_used"] == 0
+
+
+def test_entries_survive_a_restart(nova, tmp_path):
+    path = str(tmp_path / "cache.db")
+    nova.ResponseCache(path=path).put("a", "open notepad")
+    assert nova.ResponseCache(path=path).get("a") == "open notepad"
+
+
+def test_key_covers_the_context(nova):
+    make_key = nova.ResponseCache.make_key
+    assert make_key("Open Notepad!", {"editor": "notepad"}) == make_key("open notepad", {"editor": "notepad"})
+    assert make_key("open notepad", {"editor": "notepad"}) != make_key("open notepad", {"editor": "vim"})
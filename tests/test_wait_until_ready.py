@@ -0,0 +1,80 @@
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import pytest
+
+# Runs real windows on a virtual X display: needs Xvfb, xdotool and tkinter
+pytestmark = pytest.mark.skipif(sys.platform == "win32" or not (shutil.which("Xvfb") and shutil.which("xdotool")),
+                                reason="needs Xvfb and xdotool")
+
+DUMMY_WINDOW = """
+import sys
+import tkinter
+
+root = tkinter.Tk()
+root.withdraw()
+root.title(sys.argv[1])
+root.after(int(float(sys.argv[2]) * 1000), root.deiconify)
+root.mainloop()
+"""
+
+
+@pytest.fixture(scope="module")
+def display():
+    number = 90 + os.getpid() % 100
+    server = subprocess.Popen(["Xvfb", f":{number}", "-screen", "0", "1024x768x24", "-nolisten", "tcp"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while not os.path.exists(f"/tmp/.X11-unix/X{number}"):
+        if server.poll() is not None or time.monotonic() > deadline:
+            server.kill()
+            pytest.skip("Xvfb did not start")
+        time.sleep(0.1)
+    yield f":{number}"
+    server.terminate()
+    server.wait()
+
+
+@pytest.fixture
+def launch_window(display, monkeypatch, tmp_path):
+    pytest.importorskip("tkinter")
+    monkeypatch.setenv("DISPLAY", display)
+    script = tmp_path / "dummy_window.py"
+    script.write_text(DUMMY_WINDOW)
+    processes = []
+
+    def launch(title, delay):
+        process = subprocess.Popen([sys.executable, str(script), title, str(delay)])
+        processes.append(process)
+        return process
+
+    yield launch
+    for process in processes:
+        process.kill()
+        process.wait()
+
+
+def test_waits_for_the_window(nova, launch_window):
+    process = launch_window("NOVA Test Editor", 1.0)
+    started = time.monotonic()
+    window = nova.wait_until_ready(process, "NOVA Test Editor", timeout=10)
+    assert window
+    assert 1.0 <= time.monotonic() - started < 10
+
+
+def test_gives_up_at_the_timeout(nova, launch_window):
+    process = launch_window("NOVA Hidden Editor", 60)
+    started = time.monotonic()
+    assert nova.wait_until_ready(process, "NOVA Hidden Editor", timeout=1) is None
+    assert time.monotonic() - started < 3
+
+
+def test_stops_when_the_program_fails(nova, display, monkeypatch):
+    monkeypatch.setenv("DISPLAY", display)
+    process = subprocess.Popen([sys.executable, "-c", "import sys; sys.exit(3)"])
+    started = time.monotonic()
+    assert nova.wait_until_ready(process, "Never Shown", timeout=10) is None
+    assert time.monotonic() - started < 5